@@ -1,16 +1,33 @@
 from typing import Optional, List
+from collections import OrderedDict
 from contextlib import asynccontextmanager
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta, timezone
+import asyncio
+import csv
+import hashlib
+import inspect
+import io
+import json
+import math
 import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError, model_validator
 from fastapi import (
     FastAPI, APIRouter, Depends, HTTPException, status, Request, Response, Query
 )
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.responses import JSONResponse, RedirectResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
-from sqlmodel import SQLModel, Field, create_engine, Session, select, delete, or_, func
+from sqlalchemy import Index, event, exists, insert, literal
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.pool import NullPool
+from sqlmodel import SQLModel, Field, create_engine, Session, select, delete, update, or_, func
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 import openai
@@ -21,6 +38,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 openai.api_key = os.getenv("OPENAI_API_KEY")
+# Point at a local OpenAI-compatible server (e.g. a fake for tests)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000/api")
 
 # ----- Auth config -----
@@ -51,15 +70,387 @@ def get_session():
     with Session(engine) as session:
         yield session
 
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+# Startup migrations run in every worker process. Each one takes SQLite's
+# write lock up front (BEGIN IMMEDIATE) and re-checks the schema under it, so
+# workers booting together apply a migration once, one after another, and an
+# interrupted migration rolls back as a whole. The dedicated engine waits
+# long enough for another worker's migration to finish.
+MIGRATION_LOCK_TIMEOUT = 120
+migration_engine = create_engine(
+    f"sqlite:///{sqlite_file_name}", poolclass=NullPool, connect_args={"timeout": MIGRATION_LOCK_TIMEOUT}
+)
+
+def _enable_wal():
+    # Persistent in the file: readers (snapshots, the change listener) no
+    # longer block commits
+    with migration_engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+
+def _ensure_autoincrement(conn, table):
+    # AUTOINCREMENT can't be added in place; copy the rows into a rebuilt
+    # table, which also carries the highest seq over into sqlite_sequence
+    sql = conn.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table.name,)
+    ).scalar()
+    if "AUTOINCREMENT" in sql.upper():
+        return
+    old = f"{table.name}_old"
+    for index in table.indexes:
+        conn.exec_driver_sql(f'DROP INDEX IF EXISTS "{index.name}"')
+    conn.exec_driver_sql(f'ALTER TABLE "{table.name}" RENAME TO "{old}"')
+    table.create(conn)
+    columns = ", ".join(f'"{c.name}"' for c in table.columns)
+    conn.exec_driver_sql(f'INSERT INTO "{table.name}" ({columns}) SELECT {columns} FROM "{old}"')
+    conn.exec_driver_sql(f'DROP TABLE "{old}"')
+
+def _migrate_schema():
+    # create_all only creates missing tables, so bring columns and indexes on
+    # an existing jobs.db up to date with the models
+    with migration_engine.begin() as conn:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        SQLModel.metadata.create_all(conn)
+        for table in SQLModel.metadata.sorted_tables:
+            existing = {row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info("{table.name}")')}
+            for column in table.columns:
+                if column.name not in existing:
+                    coltype = column.type.compile(dialect=engine.dialect)
+                    conn.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {coltype}')
+            if table.dialect_options["sqlite"]["autoincrement"]:
+                _ensure_autoincrement(conn, table)
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    SQLModel.metadata.create_all(engine)
+    _enable_wal()
+    _migrate_schema()
+    migrate_profile_snapshots()
+    backfill_listing_coordinates()
+    start_change_listener()
+    start_job_workers()
+    start_snapshots()
     yield
+    stop_snapshots()
+    stop_job_workers()
+    stop_change_listener()
 
 app = FastAPI(lifespan=lifespan)
 
 api_router = APIRouter()
 
+
+
+# ----- Read snapshots -----
+# Heavy read-only work (exports, analytics) can run against a copy of jobs.db
+# made with SQLite's online backup API instead of contending with writers on
+# the primary. jobs.db runs in WAL mode, so the backup copies every page in a
+# single step inside one read transaction: writers keep committing while it
+# runs and the copy is consistent as of its start. (A stepped backup restarts
+# on every commit from another connection and never finishes under steady
+# writes.) The finished copy is swapped in with os.replace. Readers open the
+# snapshot through a NullPool engine, so every new session sees the latest
+# file. A snapshot older than the allowed staleness is ignored and the read
+# goes to the primary instead.
+SNAPSHOT_FILE = os.getenv("SNAPSHOT_FILE", "jobs.snapshot.db")
+SNAPSHOT_INTERVAL = float(os.getenv("SNAPSHOT_INTERVAL", "300"))
+SNAPSHOT_MAX_STALENESS = float(os.getenv("SNAPSHOT_MAX_STALENESS", "600"))
+
+snapshot_engine = create_engine(
+    f"sqlite:///file:{SNAPSHOT_FILE}?mode=ro&uri=true", poolclass=NullPool
+)
+
+snapshot_stats = {
+    "snapshots": 0,
+    "failures": 0,
+    "total_seconds": 0.0,
+    "max_seconds": 0.0,
+    "last_seconds": None,
+    "last_pages": None,
+    "last_error": None,
+}
+# Write transactions (first INSERT/UPDATE/DELETE through commit), split by
+# whether a snapshot was being taken at the time
+write_latency = {
+    "during_snapshot": {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0},
+    "outside_snapshot": {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0},
+}
+
+_snapshot_lock = threading.Lock()
+_snapshot_active = False
+_snapshot_stop = threading.Event()
+_snapshot_thread: Optional[threading.Thread] = None
+# Snapshots taken before this process migrated the schema may be missing
+# columns, so they are never read from
+_snapshot_floor = 0.0
+_write_timer = threading.local()
+
+@event.listens_for(engine, "before_cursor_execute")
+def _start_write_timer(conn, cursor, statement, parameters, context, executemany):
+    if "write_started" not in conn.info and statement.lstrip()[:6].upper() in ("INSERT", "UPDATE", "DELETE"):
+        conn.info["write_started"] = (time.perf_counter(), _snapshot_active)
+
+@event.listens_for(engine, "commit")
+def _stash_write_timer(conn):
+    _write_timer.started = conn.info.pop("write_started", None)
+
+@event.listens_for(engine, "rollback")
+def _drop_write_timer(conn):
+    conn.info.pop("write_started", None)
+
+# The engine "commit" event fires before the DBAPI commit, so the clock stops
+# once the session reports the commit done
+@event.listens_for(Session, "after_commit")
+def _record_write_latency(session: Session):
+    started = getattr(_write_timer, "started", None)
+    if started is None:
+        return
+    _write_timer.started = None
+    start, during = started
+    elapsed = time.perf_counter() - start
+    bucket = write_latency["during_snapshot" if during or _snapshot_active else "outside_snapshot"]
+    bucket["count"] += 1
+    bucket["total_seconds"] += elapsed
+    bucket["max_seconds"] = max(bucket["max_seconds"], elapsed)
+
+def create_snapshot(dest: str = SNAPSHOT_FILE) -> dict:
+    """Copy jobs.db to dest with the online backup API; also used for backups."""
+    global _snapshot_active
+    tmp = f"{dest}.{os.getpid()}.tmp"
+    progress = {"pages": 0}
+
+    def on_step(status, remaining, total):
+        progress["pages"] = total
+
+    with _snapshot_lock:
+        _snapshot_active = True
+        started_at = time.time()
+        started = time.perf_counter()
+        try:
+            source = sqlite3.connect(sqlite_file_name, timeout=30)
+            target = sqlite3.connect(tmp)
+            try:
+                source.backup(target, pages=-1, progress=on_step)
+                # The copy inherits WAL mode; a rollback journal lets it be
+                # opened read-only without creating -wal/-shm files
+                target.execute("PRAGMA journal_mode=DELETE")
+            finally:
+                target.close()
+                source.close()
+            # Age is counted from when the copy started, which is never
+            # newer than the data in it
+            os.utime(tmp, (started_at, started_at))
+            os.replace(tmp, dest)
+        except Exception as e:
+            snapshot_stats["failures"] += 1
+            snapshot_stats["last_error"] = f"{type(e).__name__}: {e}"
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        finally:
+            _snapshot_active = False
+        seconds = time.perf_counter() - started
+
+    snapshot_stats["snapshots"] += 1
+    snapshot_stats["total_seconds"] += seconds
+    snapshot_stats["max_seconds"] = max(snapshot_stats["max_seconds"], seconds)
+    snapshot_stats["last_seconds"] = seconds
+    snapshot_stats["last_pages"] = progress["pages"]
+    snapshot_stats["last_error"] = None
+    return {
+        "path": dest,
+        "seconds": round(seconds, 3),
+        "pages": progress["pages"],
+        "bytes": os.path.getsize(dest),
+    }
+
+def snapshot_age() -> Optional[float]:
+    """Seconds since the current snapshot was started, or None if there is
+    no usable snapshot."""
+    try:
+        taken_at = os.path.getmtime(SNAPSHOT_FILE)
+    except FileNotFoundError:
+        return None
+    if taken_at < _snapshot_floor:
+        return None
+    return max(0.0, time.time() - taken_at)
+
+def read_engine(max_staleness: Optional[float] = None):
+    """The snapshot engine if its data is at most max_staleness seconds old,
+    else the primary. Returns (engine, snapshot age or None)."""
+    limit = SNAPSHOT_MAX_STALENESS if max_staleness is None else max_staleness
+    age = snapshot_age()
+    if age is not None and age <= limit:
+        return snapshot_engine, age
+    return engine, None
+
+def _read_source_headers(age: Optional[float]) -> dict:
+    if age is None:
+        return {"X-Data-Source": "primary"}
+    return {"X-Data-Source": "snapshot", "X-Snapshot-Age": str(int(age))}
+
+def get_read_session(response: Response, max_staleness: Optional[float] = Query(None, ge=0)):
+    bind, age = read_engine(max_staleness)
+    response.headers.update(_read_source_headers(age))
+    with Session(bind) as session:
+        yield session
+
+def _snapshot_loop():
+    while True:
+        # Every worker process runs this loop; whichever finds the shared
+        # snapshot stale refreshes it
+        age = snapshot_age()
+        delay = 0.0 if age is None else max(0.0, SNAPSHOT_INTERVAL - age)
+        if _snapshot_stop.wait(delay):
+            return
+        try:
+            create_snapshot()
+        except Exception as e:
+            print("Snapshot failed:", e)
+            if _snapshot_stop.wait(SNAPSHOT_INTERVAL):
+                return
+
+def start_snapshots():
+    global _snapshot_thread, _snapshot_floor
+    _snapshot_floor = time.time()
+    if SNAPSHOT_INTERVAL <= 0:
+        return
+    _snapshot_stop.clear()
+    _snapshot_thread = threading.Thread(target=_snapshot_loop, name="snapshotter", daemon=True)
+    _snapshot_thread.start()
+
+def stop_snapshots():
+    _snapshot_stop.set()
+    if _snapshot_thread:
+        _snapshot_thread.join(timeout=30)
+
+@api_router.get("/snapshots/stats")
+def get_snapshot_stats():
+    def latency(bucket: dict) -> dict:
+        avg = bucket["total_seconds"] / bucket["count"] if bucket["count"] else 0.0
+        return {
+            "count": bucket["count"],
+            "avg_ms": round(avg * 1000, 2),
+            "max_ms": round(bucket["max_seconds"] * 1000, 2),
+        }
+
+    age = snapshot_age()
+    snapshots = snapshot_stats["snapshots"]
+    return {
+        **snapshot_stats,
+        "avg_seconds": snapshot_stats["total_seconds"] / snapshots if snapshots else 0.0,
+        "in_progress": _snapshot_active,
+        "age_seconds": None if age is None else round(age, 1),
+        "interval": SNAPSHOT_INTERVAL,
+        "max_staleness": SNAPSHOT_MAX_STALENESS,
+        "write_latency": {name: latency(bucket) for name, bucket in write_latency.items()},
+    }
+
+
+# ----- Admission control -----
+# Expensive routes get a token bucket per client (the verified JWT subject,
+# else client address) and a cap on in-flight requests. Anything over either limit is
+# shed at once with 429 + Retry-After rather than queued. Limits can be
+# overridden per route with ADMISSION_LIMITS='{"/api/search": {"rate": 10}}'.
+ADMISSION_LIMITS = {
+    "/api/search":     {"rate": 5.0, "burst": 20, "concurrency": 16},
+    "/api/login":      {"rate": 1.0, "burst": 5,  "concurrency": 4},
+    "/api/upload_csv": {"rate": 0.2, "burst": 2,  "concurrency": 2},
+    "/api/chat":       {"rate": 0.5, "burst": 5,  "concurrency": 8},
+}
+for _route, _override in json.loads(os.getenv("ADMISSION_LIMITS", "{}")).items():
+    ADMISSION_LIMITS[_route] = {**ADMISSION_LIMITS.get(_route, {}), **_override}
+ADMISSION_MAX_CLIENTS = int(os.getenv("ADMISSION_MAX_CLIENTS", "10000"))
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Take a token; returns 0 if one was available, else seconds to wait."""
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+# LRU-ordered so the least recently seen client is evicted at the cap
+_buckets: OrderedDict[tuple[str, str], TokenBucket] = OrderedDict()
+_in_flight: dict[str, int] = {}
+admission_stats = {
+    route: {"admitted": 0, "rate_limited": 0, "overloaded": 0} for route in ADMISSION_LIMITS
+}
+
+def _client_key(request: Request) -> str:
+    # Only a token we signed identifies a client; anything else would let a
+    # caller mint a fresh bucket per request
+    auth = request.headers.get("authorization", "")
+    if auth.lower().startswith("bearer "):
+        try:
+            payload = jwt.decode(auth[7:], SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            payload = {}
+        if payload.get("sub"):
+            return f"{payload.get('role')}:{payload['sub']}"
+    return "addr:" + (request.client.host if request.client else "unknown")
+
+def _shed(retry_after: float, detail: str):
+    return JSONResponse(
+        {"detail": detail},
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    route = request.url.path
+    limits = ADMISSION_LIMITS.get(route)
+    if limits is None or request.method == "OPTIONS":
+        return await call_next(request)
+    stats = admission_stats.setdefault(route, {"admitted": 0, "rate_limited": 0, "overloaded": 0})
+
+    now = time.monotonic()
+    bucket = None
+    if "rate" in limits:
+        key = (route, _client_key(request))
+        bucket = _buckets.get(key)
+        if bucket is None:
+            if len(_buckets) >= ADMISSION_MAX_CLIENTS:
+                _buckets.popitem(last=False)
+            bucket = _buckets[key] = TokenBucket(limits["rate"], limits.get("burst", 1))
+        else:
+            _buckets.move_to_end(key)
+        wait = bucket.take(now)
+        if wait:
+            stats["rate_limited"] += 1
+            return _shed(wait, "Rate limit exceeded")
+
+    in_flight = _in_flight.get(route, 0)
+    if in_flight >= limits.get("concurrency", math.inf):
+        stats["overloaded"] += 1
+        if bucket is not None:
+            bucket.tokens += 1
+        return _shed(1, "Server busy, try again shortly")
+
+    stats["admitted"] += 1
+    _in_flight[route] = in_flight + 1
+    try:
+        return await call_next(request)
+    finally:
+        _in_flight[route] -= 1
+
+# Registered after admission control so CORS wraps it and 429s reach the browser
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000", "http://13.58.125.108:3000"],
@@ -88,29 +479,49 @@ class User(SQLModel, table=True):
     education: Optional[str] = None
     summary: Optional[str] = None
     other: Optional[str] = None
+    deleted_at: Optional[datetime] = None
 
 class Employer(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     employer_name: str
     username: str
     hashed_password: str
+    deleted_at: Optional[datetime] = None
 
 class JobListing(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    employer_id: int = Field(foreign_key="employer.id")
+    employer_id: int = Field(foreign_key="employer.id", index=True)
     title: str
     location: str
     type: str
     experience: str
     salary: str
     description: str
+    # Filled from the gazetteer whenever location is written; None when the
+    # location isn't a known city (e.g. "Remote")
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    geo_cell: Optional[int] = Field(default=None, index=True)
+    created_at: Optional[datetime] = Field(default_factory=_utcnow)
+    updated_at: Optional[datetime] = Field(default_factory=_utcnow, sa_column_kwargs={"onupdate": _utcnow})
+    deleted_at: Optional[datetime] = None
 
 class Application(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    user_id: int = Field(foreign_key="user.id")
-    employer_id: int = Field(foreign_key="employer.id")
-    job_listing_id: int = Field(foreign_key="joblisting.id")
+    user_id: int = Field(foreign_key="user.id", index=True)
+    employer_id: int = Field(foreign_key="employer.id", index=True)
+    job_listing_id: int = Field(foreign_key="joblisting.id", index=True)
     status: Optional[str] = Field(default="Submitted")
+    profile_id: Optional[int] = Field(default=None, foreign_key="profilesnapshot.id", index=True)
+    created_at: Optional[datetime] = Field(default_factory=_utcnow)
+    updated_at: Optional[datetime] = Field(default_factory=_utcnow, sa_column_kwargs={"onupdate": _utcnow})
+    deleted_at: Optional[datetime] = None
+
+# What the applicant submitted, stored once per distinct version and shared
+# by every application that sent the same profile
+class ProfileSnapshot(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    content_hash: str = Field(unique=True)
     first_name: Optional[str] = None
     last_name: Optional[str] = None
     email: Optional[str] = None
@@ -123,6 +534,78 @@ class Application(SQLModel, table=True):
     summary: Optional[str] = None
     other: Optional[str] = None
 
+class BackgroundJob(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    kind: str
+    payload: str = "{}"
+    status: str = Field(default="queued", index=True)
+    priority: int = 0
+    attempts: int = 0
+    max_attempts: int = 3
+    run_after: datetime = Field(default_factory=_utcnow)
+    result: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=_utcnow)
+    updated_at: datetime = Field(default_factory=_utcnow)
+
+class ChangeNotice(SQLModel, table=True):
+    # AUTOINCREMENT so seq keeps climbing after a prune empties the table;
+    # listeners only look for seq above the last one they saw
+    __table_args__ = {"sqlite_autoincrement": True}
+    seq: Optional[int] = Field(default=None, primary_key=True)
+    topic: str
+    key: Optional[int] = None
+    created_at: datetime = Field(default_factory=_utcnow)
+
+class ChatSession(SQLModel, table=True):
+    id: str = Field(primary_key=True)
+    summary: Optional[str] = None
+    summarized_through: int = 0
+    created_at: datetime = Field(default_factory=_utcnow)
+    updated_at: datetime = Field(default_factory=_utcnow)
+
+class ChatTurn(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    session_id: str = Field(foreign_key="chatsession.id", index=True)
+    role: str
+    content: str
+    tokens: int = 0
+    created_at: datetime = Field(default_factory=_utcnow)
+
+class ApplicationEvent(SQLModel, table=True):
+    # AUTOINCREMENT so a seq is never reused and /changes cursors stay valid
+    __table_args__ = (
+        Index("ix_applicationevent_employer_seq", "employer_id", "seq"),
+        {"sqlite_autoincrement": True},
+    )
+    seq: Optional[int] = Field(default=None, primary_key=True)
+    application_id: int = Field(index=True)
+    user_id: int
+    employer_id: int
+    job_listing_id: int
+    kind: str
+    old_status: Optional[str] = None
+    new_status: Optional[str] = None
+    created_at: datetime = Field(default_factory=_utcnow)
+
+class HiringRollup(SQLModel, table=True):
+    # Primary key order serves "one employer over a date range" reads
+    employer_id: int = Field(primary_key=True)
+    day: date = Field(primary_key=True)
+    job_listing_id: int = Field(primary_key=True)
+    applied: int = 0
+    under_review: int = 0
+    interview: int = 0
+    rejected: int = 0
+    accepted: int = 0
+
+class LLMCacheEntry(SQLModel, table=True):
+    key: str = Field(primary_key=True)
+    value: str
+    expires_at: float
+    last_used: float = Field(index=True)
+    hits: int = 0
+
 # Pydantic models for API
 class Credentials(BaseModel):
     username: str
@@ -149,8 +632,659 @@ class SignupAttempt(BaseModel):
     employer_name: Optional[str] = None
     
 class ChatRequest(BaseModel):
-    history: list[dict]           
+    # Send message (+ session_id after the first turn) to use a server-side
+    # session; history is still accepted from older clients
+    message: Optional[str] = None
+    session_id: Optional[str] = None
+    history: Optional[list[dict]] = None
     search_history: Optional[list[str]] = None
+    no_cache: bool = False
+
+    @model_validator(mode="after")
+    def _has_conversation(self):
+        if self.message is None and self.history is None:
+            raise ValueError("Provide message or history")
+        return self
+
+# POST /applications body: the application plus the profile it was sent
+# with, which is stored as a shared ProfileSnapshot
+class ApplicationSubmission(BaseModel):
+    user_id: int
+    employer_id: int
+    job_listing_id: int
+    status: Optional[str] = "Submitted"
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    location: Optional[str] = None
+    linkedin_url: Optional[str] = None
+    experience: Optional[str] = None
+    skills: Optional[str] = None
+    education: Optional[str] = None
+    summary: Optional[str] = None
+    other: Optional[str] = None
+
+class BulkStatusUpdate(BaseModel):
+    ids: list[int]
+    status: str
+
+class BulkIds(BaseModel):
+    ids: list[int]
+
+# One row of a bulk listing update. Fields default to None without being
+# Optional, so an omitted field is left alone but an explicit null is
+# rejected like it would be by the NOT NULL column.
+class ListingUpdate(BaseModel):
+    id: int
+    title: str = None
+    location: str = None
+    type: str = None
+    experience: str = None
+    salary: str = None
+    description: str = None
+
+
+# ----- Geo -----
+# Locations are geocoded offline against gazetteer.csv (city, state, lat,
+# lon) when a listing is written. Coordinates are bucketed into a grid of
+# GEO_CELL_DEGREES squares whose ids run west to east within each latitude
+# row, so a radius query is one indexed BETWEEN per row of cells it covers
+# followed by an exact haversine check on the few rows that come back.
+GAZETTEER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gazetteer.csv")
+GEO_CELL_DEGREES = 0.5
+DEFAULT_RADIUS_MILES = 25.0
+MAX_RADIUS_MILES = 500.0
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE = EARTH_RADIUS_MILES * math.pi / 180
+
+STATE_CODES = {
+    "alabama": "al", "alaska": "ak", "arizona": "az", "arkansas": "ar", "california": "ca",
+    "colorado": "co", "connecticut": "ct", "delaware": "de", "district of columbia": "dc",
+    "florida": "fl", "georgia": "ga", "hawaii": "hi", "idaho": "id", "illinois": "il",
+    "indiana": "in", "iowa": "ia", "kansas": "ks", "kentucky": "ky", "louisiana": "la",
+    "maine": "me", "maryland": "md", "massachusetts": "ma", "michigan": "mi", "minnesota": "mn",
+    "mississippi": "ms", "missouri": "mo", "montana": "mt", "nebraska": "ne", "nevada": "nv",
+    "new hampshire": "nh", "new jersey": "nj", "new mexico": "nm", "new york": "ny",
+    "north carolina": "nc", "north dakota": "nd", "ohio": "oh", "oklahoma": "ok", "oregon": "or",
+    "pennsylvania": "pa", "rhode island": "ri", "south carolina": "sc", "south dakota": "sd",
+    "tennessee": "tn", "texas": "tx", "utah": "ut", "vermont": "vt", "virginia": "va",
+    "washington": "wa", "west virginia": "wv", "wisconsin": "wi", "wyoming": "wy",
+}
+
+_gazetteer: Optional[tuple[dict, dict]] = None
+
+def _load_gazetteer() -> tuple[dict, dict]:
+    global _gazetteer
+    if _gazetteer is None:
+        places, by_city = {}, {}
+        with open(GAZETTEER_FILE, newline="") as f:
+            for row in csv.DictReader(f):
+                point = (float(row["latitude"]), float(row["longitude"]))
+                city = row["city"].strip().lower()
+                places[(city, row["state"].strip().lower())] = point
+                by_city.setdefault(city, []).append(point)
+        # A bare city name only resolves when it isn't ambiguous
+        _gazetteer = (places, {city: pts[0] for city, pts in by_city.items() if len(pts) == 1})
+    return _gazetteer
+
+def geocode(location: Optional[str]) -> Optional[tuple[float, float]]:
+    """Resolve "City, ST", "City, State" or an unambiguous city name."""
+    if not location:
+        return None
+    places, cities = _load_gazetteer()
+    parts = [part.strip().lower() for part in location.split(",")]
+    city = parts[0]
+    if len(parts) == 1:
+        return cities.get(city)
+    state = re.sub(r"\s*\d{5}(-\d{4})?$", "", parts[1])
+    return places.get((city, STATE_CODES.get(state, state)))
+
+def _geo_row(lat: float) -> int:
+    return math.floor(lat / GEO_CELL_DEGREES) + 180
+
+def _geo_col(lon: float) -> int:
+    return math.floor(lon / GEO_CELL_DEGREES) + 360
+
+def _geo_cell(lat: float, lon: float) -> int:
+    return _geo_row(lat) * 1000 + _geo_col(lon)
+
+def _geo_fields(location: Optional[str]) -> dict:
+    point = geocode(location)
+    if point is None:
+        return {"latitude": None, "longitude": None, "geo_cell": None}
+    return {"latitude": point[0], "longitude": point[1], "geo_cell": _geo_cell(*point)}
+
+@event.listens_for(JobListing, "before_insert")
+@event.listens_for(JobListing, "before_update")
+def _geocode_listing(mapper, connection, target: JobListing):
+    for key, value in _geo_fields(target.location).items():
+        setattr(target, key, value)
+
+def _haversine_miles(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(a))
+
+def _near(origin: tuple[float, float], radius: float):
+    """WHERE clause selecting every grid cell that overlaps the search circle."""
+    lat, lon = origin
+    dlat = radius / MILES_PER_DEGREE
+    # Longitude degrees shrink toward the poles; size the box for the
+    # poleward edge so it still covers the whole circle
+    edge = min(abs(lat) + dlat, 89.0)
+    dlon = radius / (MILES_PER_DEGREE * math.cos(math.radians(edge)))
+    rows = range(_geo_row(max(lat - dlat, -90.0)), _geo_row(min(lat + dlat, 90.0)) + 1)
+    if dlon >= 180:
+        spans = [(-180.0, 180.0)]
+    else:
+        # A box that crosses the antimeridian continues at the other end of
+        # each row
+        west, east = lon - dlon, lon + dlon
+        spans = [(max(west, -180.0), min(east, 180.0))]
+        if west < -180:
+            spans.append((west + 360, 180.0))
+        if east > 180:
+            spans.append((-180.0, east - 360))
+    return or_(*[
+        JobListing.geo_cell.between(row * 1000 + _geo_col(w), row * 1000 + _geo_col(e))
+        for row in rows for w, e in spans
+    ])
+
+def _resolve_origin(near: Optional[str], lat: Optional[float], lon: Optional[float]) -> Optional[tuple[float, float]]:
+    if lat is not None or lon is not None:
+        if lat is None or lon is None:
+            raise HTTPException(400, "lat and lon must be given together")
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise HTTPException(400, "lat/lon out of range")
+        return (lat, lon)
+    if near:
+        origin = geocode(near)
+        if origin is None:
+            raise HTTPException(400, f"Unknown location: {near}")
+        return origin
+    return None
+
+def _listing_cards(rows, origin: Optional[tuple[float, float]] = None, radius: float = DEFAULT_RADIUS_MILES) -> list[dict]:
+    """Listing dicts with company name; with an origin, only those within
+    radius, nearest first, each with its distance_miles."""
+    listings = []
+    for listing, employer_name in rows:
+        data = listing.dict()
+        data["company"] = employer_name
+        if origin is not None:
+            distance = _haversine_miles(*origin, listing.latitude, listing.longitude)
+            if distance > radius:
+                continue
+            data["distance_miles"] = round(distance, 1)
+        listings.append(data)
+    if origin is not None:
+        listings.sort(key=lambda data: data["distance_miles"])
+    return listings
+
+def backfill_listing_coordinates() -> int:
+    """Geocode listings written before coordinates were stored."""
+    with Session(engine) as session:
+        rows = session.exec(
+            select(JobListing.id, JobListing.location).where(JobListing.geo_cell.is_(None))
+        ).all()
+        params = []
+        for listing_id, location in rows:
+            fields = _geo_fields(location)
+            if fields["geo_cell"] is not None:
+                params.append((fields["latitude"], fields["longitude"], fields["geo_cell"], listing_id))
+        if params:
+            # Raw executemany so the backfill doesn't bump updated_at
+            session.connection().exec_driver_sql(
+                "UPDATE joblisting SET latitude = ?, longitude = ?, geo_cell = ? WHERE id = ?", params
+            )
+            publish_change(session, "listing")
+        session.commit()
+    return len(params)
+
+
+# ----- Bulk helpers -----
+# IN (...) lists are chunked to stay under SQLite's bound-parameter limit;
+# every chunk still runs inside the caller's single transaction.
+BULK_CHUNK_SIZE = 500
+SERVER_FIELDS = {"id", "created_at", "updated_at", "deleted_at", "latitude", "longitude", "geo_cell"}
+LISTING_FIELDS = ["title", "location", "type", "experience", "salary", "description"]
+
+def _from_client(model, body: SQLModel):
+    # Table-model bodies aren't validated on the way in; rebuild without the
+    # fields the server owns so a client can't set ids or timestamps
+    try:
+        return model.model_validate(body.model_dump(exclude=SERVER_FIELDS))
+    except ValidationError as e:
+        raise HTTPException(422, e.errors(include_url=False))
+
+def _chunks(items: list, size: int = BULK_CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _existing_ids(session: Session, model, ids: list[int]) -> set[int]:
+    found = set()
+    for chunk in _chunks(ids):
+        found.update(session.exec(
+            select(model.id).where(model.id.in_(chunk), _live(model))
+        ).all())
+    return found
+
+def _bulk_results(ids: list[int], found: set[int], missing_detail: str) -> list[dict]:
+    return [
+        {"id": i, "ok": True} if i in found else {"id": i, "ok": False, "detail": missing_detail}
+        for i in ids
+    ]
+
+
+
+# ----- Profile snapshots -----
+PROFILE_FIELDS = [
+    "first_name", "last_name", "email", "phone", "location", "linkedin_url",
+    "experience", "skills", "education", "summary", "other",
+]
+
+def _profile_digest(profile: dict) -> str:
+    return hashlib.sha256(json.dumps(profile, sort_keys=True).encode()).hexdigest()
+
+def _snapshot_profile(session: Session, profile: dict) -> Optional[int]:
+    """Return the id of the snapshot holding this profile, creating it once."""
+    profile = {f: profile.get(f) for f in PROFILE_FIELDS}
+    if not any(profile.values()):
+        return None
+    digest = _profile_digest(profile)
+    session.exec(
+        sqlite_insert(ProfileSnapshot)
+        .values(content_hash=digest, **profile)
+        .on_conflict_do_nothing(index_elements=["content_hash"])
+    )
+    return session.exec(select(ProfileSnapshot.id).where(ProfileSnapshot.content_hash == digest)).one()
+
+def _application_dict(app: Application, profile: Optional[ProfileSnapshot]) -> dict:
+    data = app.dict()
+    for f in PROFILE_FIELDS:
+        data[f] = getattr(profile, f) if profile else None
+    return data
+
+def migrate_profile_snapshots() -> int:
+    # Older databases copied the profile into every application row. Move
+    # those copies into snapshots, then drop the columns (or, on SQLite
+    # before 3.35, blank them so VACUUM can reclaim the space).
+    with Session(migration_engine) as session:
+        conn = session.connection()
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        columns = {row[1] for row in conn.exec_driver_sql('PRAGMA table_info("application")')}
+        legacy = [f for f in PROFILE_FIELDS if f in columns]
+        if not legacy:
+            return 0
+
+        field_list = ", ".join(legacy)
+        rows = conn.exec_driver_sql(
+            f"SELECT id, {field_list} FROM application WHERE profile_id IS NULL"
+        ).all()
+        snapshot_ids: dict[str, int] = {}
+        assignments = []
+        for row in rows:
+            profile = {f: None for f in PROFILE_FIELDS} | dict(zip(legacy, row[1:]))
+            if not any(profile.values()):
+                continue
+            digest = _profile_digest(profile)
+            if digest not in snapshot_ids:
+                snapshot_ids[digest] = _snapshot_profile(session, profile)
+            assignments.append((snapshot_ids[digest], row[0]))
+        if assignments:
+            conn.exec_driver_sql("UPDATE application SET profile_id = ? WHERE id = ?", assignments)
+        if sqlite3.sqlite_version_info >= (3, 35, 0):
+            for f in legacy:
+                conn.exec_driver_sql(f'ALTER TABLE application DROP COLUMN "{f}"')
+        else:
+            conn.exec_driver_sql(
+                "UPDATE application SET " + ", ".join(f"{f} = NULL" for f in legacy)
+            )
+        session.commit()
+    return len(assignments)
+
+
+
+# ----- Deletes -----
+# Deletes cascade with set-based statements over indexed foreign keys, inside
+# the caller's transaction. With SOFT_DELETE=1 rows are tombstoned instead
+# (deleted_at is set) and read paths skip them; compact_database() purges old
+# tombstones and vacuums jobs.db.
+SOFT_DELETE = os.getenv("SOFT_DELETE", "0") == "1"
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+
+def _live(model):
+    return model.deleted_at.is_(None)
+
+def _get_live(session: Session, model, row_id: int):
+    row = session.get(model, row_id)
+    if row is None or row.deleted_at is not None:
+        return None
+    return row
+
+def _delete_rows(session: Session, model, *criteria):
+    if model is Application:
+        _record_events(session, "deleted", *criteria)
+    if SOFT_DELETE:
+        stmt = update(model).where(*criteria, _live(model)).values(deleted_at=_utcnow())
+    else:
+        stmt = delete(model).where(*criteria)
+    session.exec(stmt.execution_options(synchronize_session=False))
+
+def _database_size() -> int:
+    # jobs.db runs in WAL mode, so count the log alongside the main file
+    wal = f"{sqlite_file_name}-wal"
+    return os.path.getsize(sqlite_file_name) + (os.path.getsize(wal) if os.path.exists(wal) else 0)
+
+def compact_database(retention_days: int = TOMBSTONE_RETENTION_DAYS) -> dict:
+    size_before = _database_size()
+    cutoff = _utcnow() - timedelta(days=retention_days)
+    purged = {}
+    with Session(engine) as session:
+        for model in (Application, JobListing, Employer, User):
+            result = session.exec(delete(model).where(model.deleted_at < cutoff))
+            purged[model.__tablename__] = result.rowcount
+        # Profiles no application points at any more, whether their
+        # applications were just purged or hard-deleted earlier
+        result = session.exec(delete(ProfileSnapshot).where(
+            ~exists().where(Application.profile_id == ProfileSnapshot.id)
+        ))
+        purged[ProfileSnapshot.__tablename__] = result.rowcount
+        session.commit()
+    # VACUUM can't run inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("VACUUM")
+        conn.exec_driver_sql("PRAGMA optimize")
+        # In WAL mode VACUUM writes the rebuilt pages to the log; the main
+        # file only shrinks, and the log empties, once they are checkpointed
+        busy = conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)").one()[0]
+    return {
+        "purged": purged,
+        "size_before": size_before,
+        "size_after": _database_size(),
+        # A reader can hold the checkpoint back; the log is then left for
+        # the next automatic checkpoint
+        "checkpoint_blocked": bool(busy),
+    }
+
+
+
+# ----- Application events -----
+# Every apply, status change and delete appends a row to applicationevent in
+# the same transaction as the change. Consumers page through /changes with
+# the last seq they processed instead of re-reading the application table.
+APPLICATION_EVENT_COLUMNS = [
+    "application_id", "user_id", "employer_id", "job_listing_id",
+    "kind", "old_status", "new_status", "created_at",
+]
+
+def _record_event(session: Session, app: Application, kind: str,
+                  old_status: Optional[str], new_status: Optional[str]):
+    _bump_rollup(session, app, kind, new_status)
+    session.add(ApplicationEvent(
+        application_id=app.id,
+        user_id=app.user_id,
+        employer_id=app.employer_id,
+        job_listing_id=app.job_listing_id,
+        kind=kind,
+        old_status=old_status,
+        new_status=new_status,
+    ))
+
+def _record_events(session: Session, kind: str, *criteria, new_status: Optional[str] = None):
+    # Set-based: one INSERT ... SELECT over the affected (live) applications
+    _bump_rollups(session, kind, new_status, *criteria, _live(Application))
+    columns = ApplicationEvent.__table__.c
+    session.exec(insert(ApplicationEvent).from_select(
+        APPLICATION_EVENT_COLUMNS,
+        select(
+            Application.id,
+            Application.user_id,
+            Application.employer_id,
+            Application.job_listing_id,
+            literal(kind, columns.kind.type),
+            Application.status,
+            literal(new_status, columns.new_status.type),
+            literal(_utcnow(), columns.created_at.type),
+        ).where(*criteria, _live(Application)),
+    ))
+
+@api_router.get("/changes")
+def get_changes(
+    since: int = Query(0),
+    limit: int = Query(500, le=5000),
+    employer_id: Optional[int] = Query(None),
+    session: Session = Depends(get_session)
+):
+    stmt = select(ApplicationEvent).where(ApplicationEvent.seq > since)
+    if employer_id is not None:
+        stmt = stmt.where(ApplicationEvent.employer_id == employer_id)
+    events = session.exec(stmt.order_by(ApplicationEvent.seq).limit(limit)).all()
+    return {
+        "events": events,
+        "next_since": events[-1].seq if events else since,
+        "has_more": len(events) == limit,
+    }
+
+
+
+# ----- Hiring analytics -----
+# hiringrollup keeps per employer/listing/day counters of applications and of
+# status transitions. They are bumped by the same writes that append
+# application events, so the analytics endpoint only reads at most
+# listings x days rows, however many applications there are.
+ROLLUP_COLUMNS = {
+    "applied": "applied",
+    "Under Review": "under_review",
+    "Interview": "interview",
+    "Rejected": "rejected",
+    "Accepted": "accepted",
+}
+ANALYTICS_MAX_DAYS = 366
+
+def _rollup_column(kind: str, new_status: Optional[str]) -> Optional[str]:
+    if kind == "applied":
+        return "applied"
+    if kind == "status_changed":
+        return ROLLUP_COLUMNS.get(new_status)
+    return None
+
+def _upsert_rollup(stmt, column: str):
+    return stmt.on_conflict_do_update(
+        index_elements=["employer_id", "day", "job_listing_id"],
+        set_={column: HiringRollup.__table__.c[column] + stmt.excluded[column]},
+    )
+
+def _bump_rollup(session: Session, app: Application, kind: str, new_status: Optional[str]):
+    column = _rollup_column(kind, new_status)
+    if column is None:
+        return
+    stmt = sqlite_insert(HiringRollup).values(
+        employer_id=app.employer_id,
+        day=_utcnow().date(),
+        job_listing_id=app.job_listing_id,
+        **{column: 1},
+    )
+    session.exec(_upsert_rollup(stmt, column))
+
+def _bump_rollups(session: Session, kind: str, new_status: Optional[str], *criteria):
+    column = _rollup_column(kind, new_status)
+    if column is None:
+        return
+    stmt = sqlite_insert(HiringRollup).from_select(
+        ["employer_id", "day", "job_listing_id", column],
+        select(
+            Application.employer_id,
+            literal(_utcnow().date(), HiringRollup.__table__.c.day.type),
+            Application.job_listing_id,
+            func.count(),
+        )
+        .where(*criteria)
+        .group_by(Application.employer_id, Application.job_listing_id),
+    )
+    session.exec(_upsert_rollup(stmt, column))
+
+def rebuild_hiring_rollups() -> int:
+    # Replays the application event log; use after restoring or editing data
+    with Session(engine) as session:
+        session.exec(delete(HiringRollup))
+        for status, column in ROLLUP_COLUMNS.items():
+            kind = "applied" if column == "applied" else "status_changed"
+            criteria = [ApplicationEvent.kind == kind]
+            if kind == "status_changed":
+                criteria.append(ApplicationEvent.new_status == status)
+            day = func.date(ApplicationEvent.created_at)
+            stmt = sqlite_insert(HiringRollup).from_select(
+                ["employer_id", "day", "job_listing_id", column],
+                select(ApplicationEvent.employer_id, day, ApplicationEvent.job_listing_id, func.count())
+                .where(*criteria)
+                .group_by(ApplicationEvent.employer_id, day, ApplicationEvent.job_listing_id),
+            )
+            session.exec(_upsert_rollup(stmt, column))
+        session.commit()
+        return session.exec(select(func.count()).select_from(HiringRollup)).one()
+
+@api_router.get("/employers/{employer_id}/analytics")
+def get_employer_analytics(
+    employer_id: int,
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None),
+    session: Session = Depends(get_read_session)
+):
+    end = end or _utcnow().date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(400, "start must be on or before end")
+    if (end - start).days + 1 > ANALYTICS_MAX_DAYS:
+        raise HTTPException(400, f"Date range is limited to {ANALYTICS_MAX_DAYS} days")
+
+    counters = list(ROLLUP_COLUMNS.values())
+    sums = [func.sum(HiringRollup.__table__.c[c]).label(c) for c in counters]
+    in_range = (
+        HiringRollup.employer_id == employer_id,
+        HiringRollup.day >= start,
+        HiringRollup.day <= end,
+    )
+
+    by_day = session.exec(
+        select(HiringRollup.day, *sums).where(*in_range)
+        .group_by(HiringRollup.day).order_by(HiringRollup.day)
+    ).all()
+    by_listing = session.exec(
+        select(HiringRollup.job_listing_id, JobListing.title, *sums)
+        .join(JobListing, JobListing.id == HiringRollup.job_listing_id, isouter=True)
+        .where(*in_range)
+        .group_by(HiringRollup.job_listing_id, JobListing.title)
+    ).all()
+
+    def counts(row) -> dict:
+        return {c: row._mapping[c] or 0 for c in counters}
+
+    listings = []
+    for row in by_listing:
+        data = {"job_listing_id": row.job_listing_id, "title": row.title, **counts(row)}
+        data["conversion"] = data["accepted"] / data["applied"] if data["applied"] else None
+        listings.append(data)
+
+    totals = {c: sum(l[c] for l in listings) for c in counters}
+    totals["conversion"] = totals["accepted"] / totals["applied"] if totals["applied"] else None
+    return {
+        "start": start,
+        "end": end,
+        "totals": totals,
+        "by_listing": listings,
+        "by_day": [{"day": row.day, **counts(row)} for row in by_day],
+    }
+
+
+
+# ----- Change notifications -----
+# Writers record a ChangeNotice row in the same transaction as the change.
+# Every worker process polls PRAGMA data_version on a private read-only
+# connection (it only moves when another connection commits) and hands new
+# notices to local subscribers, so per-process caches are never more than
+# CHANGE_POLL_INTERVAL seconds stale. The writing process is notified on
+# commit straight away.
+CHANGE_POLL_INTERVAL = float(os.getenv("CHANGE_POLL_INTERVAL", "0.5"))
+CHANGE_RETENTION = timedelta(minutes=int(os.getenv("CHANGE_RETENTION_MINUTES", "60")))
+CHANGE_SUBSCRIBERS: dict[str, list] = {}
+
+_change_stop = threading.Event()
+_change_thread: Optional[threading.Thread] = None
+
+def on_change(*topics: str):
+    def register(fn):
+        for topic in topics:
+            CHANGE_SUBSCRIBERS.setdefault(topic, []).append(fn)
+        return fn
+    return register
+
+def publish_change(session: Session, topic: str, key: Optional[int] = None):
+    session.add(ChangeNotice(topic=topic, key=key))
+    session.info.setdefault("changes", []).append((topic, key))
+
+def _dispatch_change(topic: str, key: Optional[int]):
+    for fn in CHANGE_SUBSCRIBERS.get(topic, []):
+        try:
+            fn(key)
+        except Exception as e:
+            print(f"Change subscriber for {topic} failed:", e)
+
+def _dispatch_all():
+    for topic in CHANGE_SUBSCRIBERS:
+        _dispatch_change(topic, None)
+
+@event.listens_for(Session, "after_commit")
+def _notify_local_changes(session):
+    for topic, key in session.info.pop("changes", []):
+        _dispatch_change(topic, key)
+
+@event.listens_for(Session, "after_rollback")
+def _drop_local_changes(session):
+    session.info.pop("changes", None)
+
+def _change_listener():
+    conn = sqlite3.connect(sqlite_file_name, timeout=30)
+    try:
+        last_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changenotice").fetchone()[0]
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        last_prune = time.monotonic()
+        while not _change_stop.wait(CHANGE_POLL_INTERVAL):
+            current = conn.execute("PRAGMA data_version").fetchone()[0]
+            if current != version:
+                version = current
+                rows = conn.execute(
+                    "SELECT seq, topic, key FROM changenotice WHERE seq > ? ORDER BY seq",
+                    (last_seq,),
+                ).fetchall()
+                if rows and rows[0][0] > last_seq + 1 and last_seq:
+                    # Notices we never saw were pruned; drop everything
+                    _dispatch_all()
+                for seq, topic, key in rows:
+                    _dispatch_change(topic, key)
+                    last_seq = seq
+            if time.monotonic() - last_prune > 60:
+                last_prune = time.monotonic()
+                with Session(engine) as session:
+                    session.exec(delete(ChangeNotice).where(
+                        ChangeNotice.created_at < _utcnow() - CHANGE_RETENTION
+                    ))
+                    session.commit()
+    finally:
+        conn.close()
+
+def start_change_listener():
+    global _change_thread
+    _change_stop.clear()
+    _change_thread = threading.Thread(target=_change_listener, name="change-listener", daemon=True)
+    _change_thread.start()
+
+def stop_change_listener():
+    _change_stop.set()
+    if _change_thread:
+        _change_thread.join(timeout=5)
 
 
 
@@ -160,8 +1294,9 @@ def signup(
     attempt: SignupAttempt,
     session: Session = Depends(get_session)
 ):
-    existing_user = session.exec(select(User).where(User.username == attempt.username)).first()
-    existing_employer = session.exec(select(Employer).where(Employer.username == attempt.username)).first()
+    # A soft-deleted account doesn't hold on to its username
+    existing_user = session.exec(select(User).where(User.username == attempt.username, _live(User))).first()
+    existing_employer = session.exec(select(Employer).where(Employer.username == attempt.username, _live(Employer))).first()
     if existing_user or existing_employer:
         raise HTTPException(409, "Username already taken")
     
@@ -229,7 +1364,7 @@ def login(
     form: OAuth2PasswordRequestForm = Depends(),
     session: Session = Depends(get_session)
 ):
-    user = session.exec(select(User).where(User.username == form.username)).first()
+    user = session.exec(select(User).where(User.username == form.username, _live(User))).first()
     if user and verify_pw(form.password, user.hashed_password):
         session.refresh(user)
         token = create_token({"sub": user.username, "role": "user"})
@@ -256,7 +1391,7 @@ def login(
             }
         }
     
-    employer = session.exec(select(Employer).where(Employer.username == form.username)).first()
+    employer = session.exec(select(Employer).where(Employer.username == form.username, _live(Employer))).first()
     if employer and verify_pw(form.password, employer.hashed_password):
         session.refresh(employer)
         token = create_token({"sub": employer.username, "role": "employer"})
@@ -292,14 +1427,14 @@ def reset_password(
         raise HTTPException(401, "Invalid token")
 
     if role == "user":
-        user = session.exec(select(User).where(User.username == username)).first()
+        user = session.exec(select(User).where(User.username == username, _live(User))).first()
         if not user:
             raise HTTPException(404, "User not found")
         user.hashed_password = hash_pw(new_password)
         session.add(user)
 
     elif role == "employer":
-        employer = session.exec(select(Employer).where(Employer.username == username)).first()
+        employer = session.exec(select(Employer).where(Employer.username == username, _live(Employer))).first()
         if not employer:
             raise HTTPException(404, "Employer not found")
         employer.hashed_password = hash_pw(new_password)
@@ -315,7 +1450,7 @@ def reset_password(
 def reset_username(data: dict, session: Session = Depends(get_session)):
     email = data.get("email")  # or some identifier
     new_username = data.get("new_username")
-    user = session.exec(select(User).where(User.email == email)).first()
+    user = session.exec(select(User).where(User.email == email, _live(User))).first()
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found with given email")
@@ -343,46 +1478,54 @@ def apply_to_job(
     other: Optional[str] = Body(None),
     session: Session = Depends(get_session)
 ):
-    # Check if the application already exists
+    # Check if the application already exists; a withdrawn (soft-deleted)
+    # one doesn't count
     existing_application = session.exec(
         select(Application).where(
             (Application.user_id == user_id) &
-            (Application.job_listing_id == job_listing_id)
+            (Application.job_listing_id == job_listing_id),
+            _live(Application)
         )
     ).first()
 
     if existing_application:
         raise HTTPException(status_code=409, detail="You have already applied to this job.")
 
+    profile_id = _snapshot_profile(session, {
+        "first_name": first_name,
+        "last_name": last_name,
+        "email": email,
+        "phone": phone,
+        "location": location,
+        "linkedin_url": linkedin_url,
+        "experience": experience,
+        "skills": skills,
+        "education": education,
+        "summary": summary,
+        "other": other,
+    })
     application = Application(
         user_id=user_id,
         employer_id=employer_id,
         job_listing_id=job_listing_id,
-        first_name=first_name,
-        last_name=last_name,
-        email=email,
-        phone=phone,
-        location=location,
-        linkedin_url=linkedin_url,
-        experience=experience,
-        skills=skills,
-        education=education,
-        summary=summary,
-        other=other
+        profile_id=profile_id
     )
     session.add(application)
+    session.flush()
+    _record_event(session, application, "applied", None, application.status)
     session.commit()
     session.refresh(application)
-    return {"message": "Application submitted", "application": application}
+    profile = session.get(ProfileSnapshot, profile_id) if profile_id else None
+    return {"message": "Application submitted", "application": _application_dict(application, profile)}
 
 # ----- User endpoints -----
 @api_router.get("/users", response_model=List[User])
 def read_users(session: Session = Depends(get_session)):
-    return session.exec(select(User)).all()
+    return session.exec(select(User).where(_live(User))).all()
 
 @api_router.get("/users/{user_id}", response_model=User)
 def read_user(user_id: int, session: Session = Depends(get_session)):
-    user = session.get(User, user_id)
+    user = _get_live(session, User, user_id)
     if not user:
         raise HTTPException(404, "User not found")
     return user
@@ -390,11 +1533,11 @@ def read_user(user_id: int, session: Session = Depends(get_session)):
 # PUT update a user (NEW)
 @api_router.put("/users/{user_id}")
 def update_user(user_id: int, updated_user: User, session: Session = Depends(get_session)):
-    user = session.get(User, user_id)
+    user = _get_live(session, User, user_id)
     if not user:
         raise HTTPException(404, "User not found")
     
-    data = updated_user.dict(exclude_unset=True, exclude={"id"})
+    data = updated_user.dict(exclude_unset=True, exclude=SERVER_FIELDS)
     for key, value in data.items():
         setattr(user, key, value)
 
@@ -409,10 +1552,11 @@ def update_user(user_id: int, updated_user: User, session: Session = Depends(get
 
 @api_router.delete("/users/{user_id}")
 def delete_user(user_id: int, session: Session = Depends(get_session)):
-    user = session.get(User, user_id)
-    if not user:
+    if not _get_live(session, User, user_id):
         raise HTTPException(404, "User not found")
-    session.delete(user); session.commit()
+    _delete_rows(session, Application, Application.user_id == user_id)
+    _delete_rows(session, User, User.id == user_id)
+    session.commit()
     return {"ok": True}
 
 def get_current_user(
@@ -424,7 +1568,7 @@ def get_current_user(
         username: str = payload.get("sub")
     except JWTError:
         raise HTTPException(401, "Invalid token")
-    user = session.exec(select(User).where(User.username == username)).first()
+    user = session.exec(select(User).where(User.username == username, _live(User))).first()
     if not user:
         raise HTTPException(401, "User not found")
     return user
@@ -434,49 +1578,141 @@ def get_current_user(
 # ----- Employer endpoints -----
 @api_router.post("/employers", response_model=Employer)
 def create_employer(emp: Employer, session: Session = Depends(get_session)):
-    session.add(emp); session.commit(); session.refresh(emp)
+    emp = _from_client(Employer, emp)
+    session.add(emp); session.flush()
+    publish_change(session, "employer", emp.id)
+    session.commit(); session.refresh(emp)
     return emp
 
 @api_router.get("/employers", response_model=List[Employer])
 def read_employers(session: Session = Depends(get_session)):
-    return session.exec(select(Employer)).all()
+    return session.exec(select(Employer).where(_live(Employer))).all()
 
 # Get all job listings posted by an employer 
 @api_router.get("/employers/{employer_id}/listings", response_model=List[JobListing])
 def get_employer_listings(employer_id: int, session: Session = Depends(get_session)):
-    return session.exec(select(JobListing).where(JobListing.employer_id == employer_id)).all()
+    return session.exec(
+        select(JobListing).where(JobListing.employer_id == employer_id, _live(JobListing))
+    ).all()
 
 # GET all applications submitted to an employer
 @api_router.get("/employers/{employer_id}/applications")
 def get_received_applications(employer_id: int, session: Session = Depends(get_session)):
     results = session.exec(
-        select(Application, JobListing, User)
+        select(Application, JobListing.title, ProfileSnapshot)
         .join(JobListing, Application.job_listing_id == JobListing.id)
-        .join(User, Application.user_id == User.id)
-        .where(Application.employer_id == employer_id)
+        .outerjoin(ProfileSnapshot, Application.profile_id == ProfileSnapshot.id)
+        .where(Application.employer_id == employer_id, _live(Application))
     ).all()
 
     applications = []
-    for app, listing, user in results:
-        data = app.dict()
-        data["title"] = listing.title
+    for app, title, profile in results:
+        data = _application_dict(app, profile)
+        data["title"] = title
         applications.append(data)
     
     return applications
 
 
+# ----- Exports -----
+# Rows are pulled through a server-side cursor in yield_per chunks and written
+# out one chunk at a time, so memory stays flat however big the export is.
+# Listing exports use the same columns upload_csv reads, so they round-trip.
+# Exports read from the latest snapshot when it is within max_staleness.
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+APPLICATION_EXPORT_FIELDS = ["id", "title"] + [
+    name for name in Application.model_fields if name not in ("id", "profile_id", "deleted_at")
+] + PROFILE_FIELDS
+
+def _stream_export(stmt, to_row, columns: list[str], fmt: str, filename: str,
+                   max_staleness: Optional[float] = None):
+    if fmt not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(400, "format must be csv or ndjson")
+    bind, age = read_engine(max_staleness)
+
+    def generate():
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=columns, extrasaction="ignore")
+        if fmt == "csv":
+            writer.writeheader()
+        # The request's session is closed once the handler returns, so the
+        # generator opens its own
+        with Session(bind) as session:
+            result = session.exec(stmt.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+            for partition in result.partitions():
+                for rec in partition:
+                    row = to_row(rec)
+                    if fmt == "csv":
+                        writer.writerow(row)
+                    else:
+                        buf.write(json.dumps({c: row.get(c) for c in columns}, default=str) + "\n")
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        if buf.tell():
+            yield buf.getvalue()
+
+    return StreamingResponse(
+        generate(),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{fmt}"',
+            **_read_source_headers(age),
+        },
+    )
+
+@api_router.get("/employers/{employer_id}/applications/export")
+def export_received_applications(
+    employer_id: int,
+    format: str = Query("csv"),
+    max_staleness: Optional[float] = Query(None, ge=0)
+):
+    stmt = (
+        select(Application, JobListing.title, ProfileSnapshot)
+        .join(JobListing, Application.job_listing_id == JobListing.id)
+        .outerjoin(ProfileSnapshot, Application.profile_id == ProfileSnapshot.id)
+        .where(Application.employer_id == employer_id, _live(Application))
+        .order_by(Application.id)
+    )
+
+    def to_row(rec):
+        app, title, profile = rec
+        data = _application_dict(app, profile)
+        data["title"] = title
+        return data
+
+    return _stream_export(stmt, to_row, APPLICATION_EXPORT_FIELDS, format,
+                          f"employer_{employer_id}_applications", max_staleness)
+
+@api_router.get("/employers/{employer_id}/listings/export")
+def export_employer_listings(
+    employer_id: int,
+    format: str = Query("csv"),
+    max_staleness: Optional[float] = Query(None, ge=0)
+):
+    stmt = (
+        select(JobListing)
+        .where(JobListing.employer_id == employer_id, _live(JobListing))
+        .order_by(JobListing.id)
+    )
+    return _stream_export(stmt, lambda lst: lst.dict(), LISTING_FIELDS, format,
+                          f"employer_{employer_id}_listings", max_staleness)
+
+
 # PUT update an employer
 @api_router.put("/employers/{employer_id}")
 def update_employer(employer_id: int, updated_employer: Employer, session: Session = Depends(get_session)):
-    employer = session.get(Employer, employer_id)
+    employer = _get_live(session, Employer, employer_id)
     if not employer:
         raise HTTPException(404, "Employer not found")
     
-    data = updated_employer.dict(exclude_unset=True, exclude={"id"})
+    data = updated_employer.dict(exclude_unset=True, exclude=SERVER_FIELDS)
     for key, value in data.items():
         setattr(employer, key, value)
 
     session.add(employer)
+    publish_change(session, "employer", employer_id)
     session.commit()
     session.refresh(employer)
 
@@ -487,10 +1723,14 @@ def update_employer(employer_id: int, updated_employer: Employer, session: Sessi
 
 @api_router.delete("/employers/{employer_id}")
 def delete_employer(employer_id: int, session: Session = Depends(get_session)):
-    emp = session.get(Employer, employer_id)
-    if not emp:
+    if not _get_live(session, Employer, employer_id):
         raise HTTPException(404, "Employer not found")
-    session.delete(emp); session.commit()
+    _delete_rows(session, Application, Application.employer_id == employer_id)
+    _delete_rows(session, JobListing, JobListing.employer_id == employer_id)
+    _delete_rows(session, Employer, Employer.id == employer_id)
+    publish_change(session, "employer", employer_id)
+    publish_change(session, "listing")
+    session.commit()
     return {"ok": True}
 
 
@@ -498,33 +1738,138 @@ def delete_employer(employer_id: int, session: Session = Depends(get_session)):
 # ----- Listing endpoints -----
 @api_router.post("/listings", response_model=JobListing)
 def create_listing(lst: JobListing, session: Session = Depends(get_session)):
-    session.add(lst); session.commit(); session.refresh(lst)
+    lst = _from_client(JobListing, lst)
+    session.add(lst); session.flush()
+    publish_change(session, "listing", lst.id)
+    session.commit(); session.refresh(lst)
     return lst
 
+# Bulk create listings; each item is validated on its own so one bad row
+# doesn't sink the batch
+@api_router.post("/listings/bulk")
+def bulk_create_listings(listings: List[dict] = Body(...), session: Session = Depends(get_session)):
+    results = []
+    created = []
+    for idx, row in enumerate(listings):
+        try:
+            lst = JobListing.model_validate({k: v for k, v in row.items() if k not in SERVER_FIELDS})
+        except ValidationError as e:
+            results.append({"index": idx, "ok": False, "detail": e.errors(include_url=False)})
+            continue
+        created.append((idx, lst))
+        results.append(None)
+
+    session.add_all([lst for _, lst in created])
+    session.flush()
+    for idx, lst in created:
+        results[idx] = {"index": idx, "ok": True, "id": lst.id}
+    if created:
+        publish_change(session, "listing")
+    session.commit()
+    return {"created": len(created), "results": results}
+
+# Bulk update listings by id; like bulk create, each row is validated and
+# reported on its own, keyed by its index in the request
+@api_router.put("/listings/bulk")
+def bulk_update_listings(listings: List[dict] = Body(...), session: Session = Depends(get_session)):
+    results = []
+    valid = []
+    for idx, row in enumerate(listings):
+        try:
+            item = ListingUpdate.model_validate(row)
+        except ValidationError as e:
+            results.append({"index": idx, "ok": False, "detail": e.errors(include_url=False)})
+            continue
+        fields = item.model_dump(exclude_unset=True, exclude={"id"})
+        if not fields:
+            results.append({"index": idx, "id": item.id, "ok": False, "detail": "No fields to update"})
+            continue
+        valid.append((idx, item.id, fields))
+        results.append(None)
+
+    found = _existing_ids(session, JobListing, list(dict.fromkeys(i for _, i, _ in valid)))
+    params = []
+    for idx, listing_id, fields in valid:
+        if listing_id not in found:
+            results[idx] = {"index": idx, "id": listing_id, "ok": False, "detail": "Listing not found"}
+            continue
+        # Bulk UPDATE by primary key skips mapper events, so geocode here
+        if "location" in fields:
+            fields.update(_geo_fields(fields["location"]))
+        params.append({"id": listing_id, **fields})
+        results[idx] = {"index": idx, "id": listing_id, "ok": True}
+
+    if params:
+        session.exec(update(JobListing), params=params)
+        publish_change(session, "listing")
+    session.commit()
+    return {"updated": len(params), "results": results}
+
+# Bulk delete listings and their applications
+@api_router.delete("/listings/bulk")
+def bulk_delete_listings(req: BulkIds, session: Session = Depends(get_session)):
+    ids = list(dict.fromkeys(req.ids))
+    found = _existing_ids(session, JobListing, ids)
+    for chunk in _chunks([i for i in ids if i in found]):
+        _delete_rows(session, Application, Application.job_listing_id.in_(chunk))
+        _delete_rows(session, JobListing, JobListing.id.in_(chunk))
+    if found:
+        publish_change(session, "listing")
+    session.commit()
+    return {"deleted": len(found), "results": _bulk_results(ids, found, "Listing not found")}
+
 # GET all listings
 @api_router.get("/listings", response_model=List[JobListing])
 def get_listings(session: Session = Depends(get_session)):
-    return session.exec(select(JobListing)).all()
+    return session.exec(select(JobListing).where(_live(JobListing))).all()
 
-# GET all listings for job cards
+# Job cards are served from a per-process cache that is dropped whenever any
+# worker changes a listing or employer
+_jobcard_cache: Optional[list[dict]] = None
+_jobcard_generation = 0
+
+@on_change("listing", "employer")
+def _invalidate_jobcards(key: Optional[int]):
+    global _jobcard_cache, _jobcard_generation
+    _jobcard_generation += 1
+    _jobcard_cache = None
+
+# GET all listings for job cards; a radius query skips the cache and goes
+# through the geo index instead
 @api_router.get("/jobcard")
-def get_listings(session: Session = Depends(get_session)):
-    joined = session.exec(
-        select(JobListing, Employer.employer_name).join(Employer, Employer.id == JobListing.employer_id)
-    ).all()
+def get_listings(
+    near: Optional[str] = Query(None),
+    lat: Optional[float] = Query(None),
+    lon: Optional[float] = Query(None),
+    radius: float = Query(DEFAULT_RADIUS_MILES, gt=0, le=MAX_RADIUS_MILES),
+    session: Session = Depends(get_session),
+):
+    global _jobcard_cache
+    stmt = (
+        select(JobListing, Employer.employer_name)
+        .join(Employer, Employer.id == JobListing.employer_id)
+        .where(_live(JobListing))
+    )
+    origin = _resolve_origin(near, lat, lon)
+    if origin is not None:
+        return _listing_cards(session.exec(stmt.where(_near(origin, radius))).all(), origin, radius)
 
-    listings = []
-    for listing, employer_name in joined:
-        data = listing.dict()
-        data["company"] = employer_name
-        listings.append(data)
+    cached = _jobcard_cache
+    if cached is not None:
+        return cached
+    generation = _jobcard_generation
 
+    listings = _listing_cards(session.exec(stmt).all())
+
+    # Don't cache a result that an invalidation raced past
+    if generation == _jobcard_generation:
+        _jobcard_cache = listings
     return listings
 
 # GET listing by id
 @api_router.get("/listings/{listing_id}", response_model=JobListing)
 def get_listing(listing_id: int, session: Session = Depends(get_session)):
-    listing = session.get(JobListing, listing_id)
+    listing = _get_live(session, JobListing, listing_id)
     if not listing:
         raise HTTPException(404, "Listing not found")
     return listing
@@ -532,41 +1877,73 @@ def get_listing(listing_id: int, session: Session = Depends(get_session)):
 # PUT update a listing
 @api_router.put("/listings/{listing_id}", response_model=JobListing)
 def update_listing(listing_id: int, updated_listing: JobListing, session: Session = Depends(get_session)):
-    listing = session.get(JobListing, listing_id)
+    listing = _get_live(session, JobListing, listing_id)
     if not listing:
         raise HTTPException(404, "Listing not found")
     
-    data = updated_listing.dict(exclude_unset=True, exclude={"id", "employer_id"})
+    data = updated_listing.dict(exclude_unset=True, exclude=SERVER_FIELDS | {"employer_id"})
     for key, value in data.items():
         setattr(listing, key, value)
 
     session.add(listing)
+    publish_change(session, "listing", listing_id)
     session.commit()
     session.refresh(listing)
     return listing
 
+def _delete_listing(session: Session, listing_id: int) -> bool:
+    if not _get_live(session, JobListing, listing_id):
+        return False
+
+    _delete_rows(session, Application, Application.job_listing_id == listing_id)
+    _delete_rows(session, JobListing, JobListing.id == listing_id)
+    publish_change(session, "listing", listing_id)
+    session.commit()
+    return True
+
 @api_router.delete("/listings/{listing_id}")
-def delete_listing(listing_id: int, session: Session = Depends(get_session)):
-    lst = session.get(JobListing, listing_id)
-    if not lst:
-        raise HTTPException(404, "Listing not found")
-    
-    session.exec(delete(Application).where(Application.job_listing_id == listing_id))
+def delete_listing(
+    listing_id: int,
+    response: Response,
+    background: bool = Query(False),
+    session: Session = Depends(get_session)
+):
+    if background:
+        if not _get_live(session, JobListing, listing_id):
+            raise HTTPException(404, "Listing not found")
+        return _accepted(response, enqueue_job(session, "delete_listing", {"listing_id": listing_id}))
 
-    session.delete(lst); session.commit()
+    if not _delete_listing(session, listing_id):
+        raise HTTPException(404, "Listing not found")
     return {"ok": True}
 
 
 
 # ----- Application endpoints -----
-@api_router.post("/applications", response_model=Application)
-def create_application(application: Application, session: Session = Depends(get_session)):
-    session.add(application); session.commit(); session.refresh(application)
-    return application
+@api_router.post("/applications")
+def create_application(submission: ApplicationSubmission, session: Session = Depends(get_session)):
+    data = submission.model_dump()
+    application = Application(
+        user_id=submission.user_id,
+        employer_id=submission.employer_id,
+        job_listing_id=submission.job_listing_id,
+        status=submission.status,
+        profile_id=_snapshot_profile(session, data),
+    )
+    session.add(application); session.flush()
+    _record_event(session, application, "applied", None, application.status)
+    session.commit(); session.refresh(application)
+    profile = session.get(ProfileSnapshot, application.profile_id) if application.profile_id else None
+    return _application_dict(application, profile)
 
-@api_router.get("/applications", response_model=List[Application])
+@api_router.get("/applications")
 def read_application(session: Session = Depends(get_session)):
-    return session.exec(select(Application)).all()
+    results = session.exec(
+        select(Application, ProfileSnapshot)
+        .outerjoin(ProfileSnapshot, Application.profile_id == ProfileSnapshot.id)
+        .where(_live(Application))
+    ).all()
+    return [_application_dict(app, profile) for app, profile in results]
 
 @api_router.get("/applications/{user_id}")
 def get_applications(user_id: int, session: Session = Depends(get_session)):
@@ -574,7 +1951,7 @@ def get_applications(user_id: int, session: Session = Depends(get_session)):
         select(Application, JobListing, Employer.employer_name)
         .join(JobListing, Application.job_listing_id == JobListing.id)
         .join(Employer, JobListing.employer_id == Employer.id)
-        .where(Application.user_id == user_id)
+        .where(Application.user_id == user_id, _live(Application))
     ).all()
 
     # Return list of job listings the user applied to
@@ -598,7 +1975,8 @@ def get_application_status(user_id: int, session: Session = Depends(get_session)
         count = session.exec(
             select(func.count()).where(
                 Application.status == status,
-                Application.user_id == user_id
+                Application.user_id == user_id,
+                _live(Application)
             )
         ).one()
         results[status] = count
@@ -617,7 +1995,8 @@ def get_application_status(employer_id: int, session: Session = Depends(get_sess
         count = session.exec(
             select(func.count()).where(
                 Application.status == status,
-                Application.employer_id == employer_id
+                Application.employer_id == employer_id,
+                _live(Application)
             )
         ).one()
         results[status] = count
@@ -628,27 +2007,32 @@ def get_application_status(employer_id: int, session: Session = Depends(get_sess
 
 @api_router.delete("/applications/{application_id}")
 def delete_application(application_id: int, session: Session = Depends(get_session)):
-    application = session.get(Application, application_id)
-    if not application:
+    if not _get_live(session, Application, application_id):
         raise HTTPException(404, "Application not found")
-    session.delete(application); session.commit()
+    _delete_rows(session, Application, Application.id == application_id)
+    session.commit()
     return {"ok": True}
 
 @api_router.get("/application/{app_id}")
 def application_detail(app_id: int, session: Session = Depends(get_session)):
     rec = session.exec(
-        select(Application, JobListing, User)
+        select(Application, JobListing, ProfileSnapshot)
         .join(JobListing, Application.job_listing_id == JobListing.id)
-        .join(User,        Application.user_id       == User.id)
-        .where(Application.id == app_id)
+        .outerjoin(ProfileSnapshot, Application.profile_id == ProfileSnapshot.id)
+        .where(Application.id == app_id, _live(Application))
     ).first()
 
     if not rec:
         raise HTTPException(404, "Application not found")
 
-    app, listing, applicant = rec
+    app, listing, profile = rec
+    # Show what was submitted; fall back to the live profile for applications
+    # sent without one
+    applicant = profile or session.get(User, app.user_id)
+    if not applicant:
+        raise HTTPException(404, "Applicant not found")
     return {
-        "application": app,
+        "application": _application_dict(app, profile),
         "listing": {
             "id":    listing.id,
             "title": listing.title,
@@ -674,24 +2058,140 @@ def update_application_status(
     status: str = Body(..., embed=True),
     session: Session = Depends(get_session)
 ):
-    app = session.get(Application, app_id)
+    app = _get_live(session, Application, app_id)
     if not app:
         raise HTTPException(404, "Application not found")
 
+    if app.status != status:
+        _record_event(session, app, "status_changed", app.status, status)
     app.status = status
     session.add(app)
     session.commit()
     session.refresh(app)
     return {"message": "Status updated", "application": app}
 
+@api_router.put("/applications/status/bulk")
+def bulk_update_application_status(req: BulkStatusUpdate, session: Session = Depends(get_session)):
+    ids = list(dict.fromkeys(req.ids))
+    found = _existing_ids(session, Application, ids)
+    for chunk in _chunks([i for i in ids if i in found]):
+        _record_events(
+            session, "status_changed",
+            Application.id.in_(chunk), Application.status.is_distinct_from(req.status),
+            new_status=req.status,
+        )
+        session.exec(
+            update(Application)
+            .where(Application.id.in_(chunk))
+            .values(status=req.status)
+            .execution_options(synchronize_session=False)
+        )
+    session.commit()
+    return {"updated": len(found), "results": _bulk_results(ids, found, "Application not found")}
+
+
+
+# ----- Request coalescing -----
+# Concurrent calls with the same key share one in-flight computation, and a
+# finished result is reused for SINGLEFLIGHT_GRACE seconds. Keys are tuples
+# whose first item names the namespace, so a namespace can be dropped when
+# the data behind it changes. If the caller running the computation is
+# cancelled (its client disconnected), a waiting caller takes it over rather
+# than every follower failing with it. forget() is called from other
+# threads, so it only bumps the namespace's generation: a result computed
+# under an older generation is neither stored nor served.
+SINGLEFLIGHT_GRACE = float(os.getenv("SINGLEFLIGHT_GRACE", "2.0"))
+_HANDOFF = object()
+
+class SingleFlight:
+    def __init__(self, grace: float = 0.0):
+        self.grace = grace
+        self._in_flight: dict[tuple, asyncio.Future] = {}
+        self._recent: dict[tuple, tuple[float, int, object]] = {}
+        self._generations: dict[str, int] = {}
+        self._generation_lock = threading.Lock()
+        self.stats = {"calls": 0, "executed": 0, "coalesced": 0, "grace_hits": 0, "handoffs": 0}
+
+    async def do(self, key: tuple, fn):
+        self.stats["calls"] += 1
+        now = time.monotonic()
+        generation = self._generations.get(key[0], 0)
+        recent = self._recent.get(key)
+        if recent and recent[0] > now and recent[1] == generation:
+            self.stats["grace_hits"] += 1
+            return recent[2]
+
+        while key in self._in_flight:
+            self.stats["coalesced"] += 1
+            result = await asyncio.shield(self._in_flight[key])
+            if result is not _HANDOFF:
+                return result
+            # The leader was cancelled; the first follower back here leads
+
+        fut = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = fut
+        self.stats["executed"] += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            self.stats["handoffs"] += 1
+            fut.set_result(_HANDOFF)
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()  # followers re-raise it; don't log it as unretrieved
+            raise
+        finally:
+            del self._in_flight[key]
+
+        fut.set_result(result)
+        # Skip storing if the data changed while this was computing
+        if self.grace and self._generations.get(key[0], 0) == generation:
+            if len(self._recent) > 1024:
+                self._recent = {k: v for k, v in self._recent.items() if v[0] > now}
+            self._recent[key] = (time.monotonic() + self.grace, generation, result)
+        return result
+
+    def forget(self, namespace: str):
+        with self._generation_lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+singleflight = SingleFlight(grace=SINGLEFLIGHT_GRACE)
+
+@on_change("listing", "employer")
+def _forget_search_results(key: Optional[int]):
+    singleflight.forget("search")
+
+@api_router.get("/singleflight/stats")
+def get_singleflight_stats():
+    return singleflight.stats
+
 
 
 # ----- DB Search -----
+# With near (free-text location, e.g. a user's profile location) or lat/lon,
+# results are limited to radius miles and sorted nearest first
 @api_router.get("/search")
-def search_listings(q: str = Query(...), session: Session = Depends(get_session)):
+async def search_listings(
+    q: str = Query(""),
+    near: Optional[str] = Query(None),
+    lat: Optional[float] = Query(None),
+    lon: Optional[float] = Query(None),
+    radius: float = Query(DEFAULT_RADIUS_MILES, gt=0, le=MAX_RADIUS_MILES),
+):
+    origin = _resolve_origin(near, lat, lon)
+    key = ("search", q.lower(), origin, radius if origin else None)
+    return await singleflight.do(
+        key, lambda: run_in_threadpool(_search_listings, q, origin, radius)
+    )
+
+def _search_listings(q: str, origin: Optional[tuple[float, float]] = None, radius: float = DEFAULT_RADIUS_MILES):
     query_lower = f"%{q.lower()}%"
     stmt = select(JobListing, Employer.employer_name).join(Employer, JobListing.employer_id == Employer.id).where(
-        or_(
+        _live(JobListing)
+    )
+    if q:
+        stmt = stmt.where(or_(
             func.lower(Employer.employer_name).like(query_lower),
             func.lower(JobListing.title).like(query_lower),
             func.lower(JobListing.description).like(query_lower),
@@ -699,16 +2199,13 @@ def search_listings(q: str = Query(...), session: Session = Depends(get_session)
             func.lower(JobListing.experience).like(query_lower),
             func.lower(JobListing.location).like(query_lower),
             func.lower(JobListing.salary).like(query_lower),
-        )
-    )
+        ))
+    if origin is not None:
+        stmt = stmt.where(_near(origin, radius))
 
-    query_result = session.exec(stmt).all()
-    listings = []
-    for listing, employer_name in query_result:
-        data = listing.dict()
-        data["company"] = employer_name
-        listings.append(data)
-    return listings
+    with Session(engine) as session:
+        query_result = session.exec(stmt).all()
+    return _listing_cards(query_result, origin, radius)
 
 
 
@@ -716,9 +2213,7 @@ def search_listings(q: str = Query(...), session: Session = Depends(get_session)
 ADZUNA_APP_ID = "b93f0af2"
 ADZUNA_APP_KEY = "ac2968e9aa37b2d474d60277da360974"
 
-@api_router.get("/adzuna")
-async def get_adzuna_jobs(q: str):
-    import httpx
+async def _fetch_adzuna(q: str):
     url = "https://api.adzuna.com/v1/api/jobs/us/search/1"
     params = {
         "app_id": ADZUNA_APP_ID,
@@ -745,10 +2240,36 @@ async def get_adzuna_jobs(q: str):
             for j in data["results"]
         ]
 
+@api_router.get("/adzuna")
+async def get_adzuna_jobs(
+    q: str,
+    response: Response,
+    background: bool = Query(False),
+    session: Session = Depends(get_session)
+):
+    if background:
+        return _accepted(response, enqueue_job(session, "adzuna", {"q": q}, priority=10))
+    return await singleflight.do(("adzuna", q.strip().lower()), lambda: _fetch_adzuna(q))
+
+# ----- Remotive -----
+REMOTIVE_URL = "https://remotive.com/api/remote-jobs"
+
+async def _query_remotive(params: dict) -> list[dict]:
+    async with httpx.AsyncClient(timeout=10) as client:
+        res = await client.get(REMOTIVE_URL, params=params)
+        res.raise_for_status()
+        return res.json().get("jobs", [])
+
+async def _query_remotive_coalesced(term: str, limit: int):
+    return await singleflight.do(
+        ("remotive", term.strip().lower(), limit),
+        lambda: _query_remotive({"search": term, "limit": limit}),
+    )
+
 
 @api_router.get("/remote")
 async def remote_search(q: str, limit: int = 10):
-    jobs = (await _query_remotive({"search": q, "limit": limit}))[:limit]
+    jobs = (await _query_remotive_coalesced(q, limit))[:limit]
     return [
         {
             "id": idx,
@@ -768,11 +2289,11 @@ async def get_similar_jobs(
     limit: int = 5,
     session: Session = Depends(get_session),
 ):
-    listing = session.get(JobListing, listing_id)
+    listing = _get_live(session, JobListing, listing_id)
     if not listing:
         raise HTTPException(404, "Listing not found")
 
-    jobs = (await _query_remotive({"search": listing.title, "limit": limit}))[:limit]
+    jobs = (await _query_remotive_coalesced(listing.title, limit))[:limit]
     return {
         "local_listing": listing,
         "remote_matches": [
@@ -810,11 +2331,136 @@ def google_callback(code: str):
 
 @api_router.get("/debug/usernames")
 def get_usernames(session: Session = Depends(get_session)):
-    users = session.exec(select(User)).all()
-    employers = session.exec(select(Employer)).all()
+    users = session.exec(select(User).where(_live(User))).all()
+    employers = session.exec(select(Employer).where(_live(Employer))).all()
     return {
         "usernames": [u.username for u in users + employers]
     }
+# ----- LLM response cache -----
+# Chat completions and job suggestions are cached under a hash of their
+# normalized inputs: a small in-memory LRU in front of the llmcacheentry
+# table, which keeps entries across restarts. Table reads and writes run in
+# the threadpool, off the event loop. Expired entries are ignored, and every
+# LLM_CACHE_TRIM_EVERY inserts the table is purged of them and trimmed back
+# to LLM_CACHE_SIZE least-recently-used rows.
+# LLM_CACHE=0 turns it off; ChatRequest.no_cache skips it per request.
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "1") == "1"
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "5000"))
+LLM_CACHE_MEMORY_SIZE = 512
+LLM_CACHE_TRIM_EVERY = int(os.getenv("LLM_CACHE_TRIM_EVERY", "100"))
+SUGGESTION_CACHE_TTL = int(os.getenv("SUGGESTION_CACHE_TTL", "3600"))
+
+class ResponseCache:
+    def __init__(self, size: int, memory_size: int):
+        self.size = size
+        self.memory_size = memory_size
+        self._memory: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._inserts = 0
+        self.stats: dict[str, dict] = {}
+
+    @staticmethod
+    def make_key(namespace: str, payload) -> str:
+        raw = json.dumps([namespace, payload], sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key: str):
+        value = self._recall(key)
+        return value if value is not None else self._load(key)
+
+    def _recall(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    return entry[1]
+                del self._memory[key]
+        return None
+
+    def _load(self, key: str):
+        now = time.time()
+        with Session(engine) as session:
+            row = session.get(LLMCacheEntry, key)
+            if row is None or row.expires_at <= now:
+                return None
+            row.last_used = now
+            row.hits += 1
+            session.add(row)
+            session.commit()
+            value = json.loads(row.value)
+            self._remember(key, row.expires_at, value)
+            return value
+
+    def put(self, key: str, value, ttl: int):
+        now = time.time()
+        self._remember(key, now + ttl, value)
+        with self._lock:
+            self._inserts += 1
+            trim = self._inserts % LLM_CACHE_TRIM_EVERY == 0
+        with Session(engine) as session:
+            session.merge(LLMCacheEntry(
+                key=key, value=json.dumps(value), expires_at=now + ttl, last_used=now
+            ))
+            if trim:
+                self._trim(session, now)
+            session.commit()
+
+    def _trim(self, session: Session, now: float):
+        session.exec(delete(LLMCacheEntry).where(LLMCacheEntry.expires_at <= now))
+        overflow = session.exec(select(func.count()).select_from(LLMCacheEntry)).one() - self.size
+        if overflow > 0:
+            oldest = select(LLMCacheEntry.key).order_by(LLMCacheEntry.last_used).limit(overflow)
+            session.exec(delete(LLMCacheEntry).where(LLMCacheEntry.key.in_(oldest)))
+
+    def _remember(self, key: str, expires_at: float, value):
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    async def get_or_compute(self, namespace: str, payload, fn, ttl: int, enabled: bool = True):
+        if not (enabled and LLM_CACHE_ENABLED):
+            return await fn()
+        stats = self.stats.setdefault(namespace, {"hits": 0, "misses": 0, "miss_seconds": 0.0})
+        key = self.make_key(namespace, payload)
+        value = self._recall(key)
+        if value is None:
+            value = await run_in_threadpool(self._load, key)
+        if value is not None:
+            stats["hits"] += 1
+            return value
+
+        started = time.perf_counter()
+        value = await fn()
+        stats["misses"] += 1
+        stats["miss_seconds"] += time.perf_counter() - started
+        await run_in_threadpool(self.put, key, value, ttl)
+        return value
+
+llm_cache = ResponseCache(LLM_CACHE_SIZE, LLM_CACHE_MEMORY_SIZE)
+
+def _normalize_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+@api_router.get("/llm-cache/stats")
+def get_llm_cache_stats():
+    report = {}
+    for namespace, stats in llm_cache.stats.items():
+        lookups = stats["hits"] + stats["misses"]
+        avg_miss = stats["miss_seconds"] / stats["misses"] if stats["misses"] else 0.0
+        report[namespace] = {
+            "hits": stats["hits"],
+            "misses": stats["misses"],
+            "hit_rate": stats["hits"] / lookups if lookups else 0.0,
+            "avg_miss_seconds": round(avg_miss, 4),
+            "estimated_seconds_saved": round(stats["hits"] * avg_miss, 2),
+        }
+    return {"enabled": LLM_CACHE_ENABLED, "namespaces": report}
+
 async def _query_adzuna(term: str, limit: int = 3):
     async with httpx.AsyncClient(timeout=10) as client:
         r = await client.get(f"{API_BASE_URL}/adzuna", params={"q": term})
@@ -822,32 +2468,184 @@ async def _query_adzuna(term: str, limit: int = 3):
         data = r.json()
         return data[:limit]
 
-@api_router.post("/chat")
-async def chat(req: ChatRequest):
+# ----- Chat sessions -----
+# Turns are stored server-side, so the client only sends the new message.
+# Each prompt carries the cached session summary plus as many recent turns as
+# fit in CHAT_CONTEXT_TOKENS. When the unsummarized turns outgrow the budget,
+# the oldest are folded into the summary until the rest fit in half of it,
+# so the summarizer runs every few turns rather than on every one.
+CHAT_MODEL = "gpt-3.5-turbo"
+CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "1500"))
+CHAT_SUMMARY_MAX_TOKENS = 200
+
+def _estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English, plus per-message overhead
+    return len(text) // 4 + 4
+
+def _llm_client() -> AsyncOpenAI:
+    return AsyncOpenAI(api_key=openai.api_key, base_url=OPENAI_BASE_URL)
+
+async def _summarize_turns(summary: Optional[str], turns: list[ChatTurn]) -> str:
+    transcript = "\n".join(f"{t.role}: {t.content}" for t in turns)
+    prompt = (
+        "Condense this job-search chat into a short summary (under 120 words) "
+        "that keeps the user's goals, preferences and any jobs discussed.\n\n"
+        + (f"Summary so far: {summary}\n\n" if summary else "")
+        + transcript
+    )
+    client = _llm_client()
+    resp = await client.chat.completions.create(
+        model=CHAT_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        max_tokens=CHAT_SUMMARY_MAX_TOKENS,
+        temperature=0.2,
+    )
+    return resp.choices[0].message.content.strip()
+
+# The session is read and written in short sync steps run off the event loop;
+# no Session is held open while the summarizer or the chat model is awaited
+def _load_turns(session_id: str) -> tuple[Optional[str], list[ChatTurn]]:
+    with Session(engine) as session:
+        chat_session = session.get(ChatSession, session_id)
+        turns = session.exec(
+            select(ChatTurn)
+            .where(
+                ChatTurn.session_id == session_id,
+                ChatTurn.id > chat_session.summarized_through,
+            )
+            .order_by(ChatTurn.id)
+        ).all()
+        return chat_session.summary, turns
+
+def _save_summary(session_id: str, summary: str, summarized_through: int):
+    with Session(engine) as session:
+        chat_session = session.get(ChatSession, session_id)
+        # A concurrent request may have folded further already
+        if chat_session is None or chat_session.summarized_through >= summarized_through:
+            return
+        chat_session.summary = summary
+        chat_session.summarized_through = summarized_through
+        session.add(chat_session)
+        session.commit()
+
+async def _session_context(session_id: str) -> list[dict]:
+    summary, turns = await run_in_threadpool(_load_turns, session_id)
+
+    budget = CHAT_CONTEXT_TOKENS - _estimate_tokens(summary or "")
+    if sum(t.tokens for t in turns) > budget:
+        keep_from, kept = len(turns) - 1, turns[-1].tokens
+        while keep_from > 0 and kept + turns[keep_from - 1].tokens <= budget // 2:
+            keep_from -= 1
+            kept += turns[keep_from].tokens
+        folded = turns[:keep_from]
+        if folded:
+            summary = await _summarize_turns(summary, folded)
+            await run_in_threadpool(_save_summary, session_id, summary, folded[-1].id)
+        turns = turns[keep_from:]
+
+    messages = []
+    if summary:
+        messages.append({"role": "system", "content": f"Conversation so far: {summary}"})
+    return messages + [{"role": t.role, "content": t.content} for t in turns]
+
+def _add_turn(session: Session, chat_session: ChatSession, role: str, content: str):
+    session.add(ChatTurn(
+        session_id=chat_session.id, role=role, content=content, tokens=_estimate_tokens(content)
+    ))
+    chat_session.updated_at = _utcnow()
+    session.add(chat_session)
+    session.commit()
+
+def _start_turn(session_id: Optional[str], message: str) -> str:
+    # Records the user's message, opening a new session if needed
+    with Session(engine) as session:
+        chat_session = session.get(ChatSession, session_id) if session_id else None
+        if chat_session is None:
+            chat_session = ChatSession(id=uuid.uuid4().hex)
+            session.add(chat_session)
+        _add_turn(session, chat_session, "user", message)
+        return chat_session.id
+
+def _finish_turn(session_id: str, reply: str):
+    with Session(engine) as session:
+        chat_session = session.get(ChatSession, session_id)
+        # Deleted while the reply was being generated
+        if chat_session is not None:
+            _add_turn(session, chat_session, "assistant", reply)
+
+@api_router.get("/chat/sessions/{session_id}")
+def get_chat_session(session_id: str, session: Session = Depends(get_session)):
+    chat_session = session.get(ChatSession, session_id)
+    if not chat_session:
+        raise HTTPException(404, "Chat session not found")
+    turns = session.exec(
+        select(ChatTurn).where(ChatTurn.session_id == session_id).order_by(ChatTurn.id)
+    ).all()
+    return {
+        "id": chat_session.id,
+        "summary": chat_session.summary,
+        "turns": [{"role": t.role, "content": t.content} for t in turns],
+    }
+
+@api_router.delete("/chat/sessions/{session_id}")
+def delete_chat_session(session_id: str, session: Session = Depends(get_session)):
+    chat_session = session.get(ChatSession, session_id)
+    if not chat_session:
+        raise HTTPException(404, "Chat session not found")
+    session.exec(delete(ChatTurn).where(ChatTurn.session_id == session_id))
+    session.delete(chat_session)
+    session.commit()
+    return {"ok": True}
+
+async def _job_suggestions(last_terms: list[str]):
+    suggestions = []
+    for term in last_terms:
+        suggestions += await _query_adzuna(term,2)
+
+    seen = set()
+    uniq  = []
+    for j in suggestions:
+        key = j["title"]
+        if key not in seen and len(uniq) < 4:
+            uniq.append(j); seen.add(key)
+    return uniq
+
+async def _complete_chat(messages: list[dict]) -> str:
+    client = _llm_client()
+    resp = await client.chat.completions.create(
+        model=CHAT_MODEL,
+        messages=messages,
+        max_tokens=120,
+        temperature=0.7,
+    )
+    return resp.choices[0].message.content.strip()
+
+async def _chat_reply(req: ChatRequest):
     system_prompt = (
         "You are Jobby, a concise, friendly job-search assistant. "
         "If you see job titles, suggest actions or next steps."
     )
 
-    allowed = {"user", "assistant"}
-    messages = ([{"role": "system", "content": system_prompt}]
-                + [m for m in req.history if m.get("role") in allowed]
-   )
+    chat_session_id = None
+    if req.message is not None:
+        chat_session_id = await run_in_threadpool(_start_turn, req.session_id, req.message)
+        history = await _session_context(chat_session_id)
+    else:
+        allowed = {"user", "assistant"}
+        history = [m for m in req.history if m.get("role") in allowed]
+
+    messages = [{"role": "system", "content": system_prompt}] + history
 
     suggestions = []
     if req.search_history:
         last_terms = req.search_history[-3:]              
-        for term in last_terms:
-            suggestions += await _query_adzuna(term,2)
-
-        
-        seen = set()
-        uniq  = []
-        for j in suggestions:
-            key = j["title"]
-            if key not in seen and len(uniq) < 4:
-                uniq.append(j); seen.add(key)
-        suggestions = uniq
+        suggestions = await llm_cache.get_or_compute(
+            "suggestions",
+            [_normalize_text(t) for t in last_terms],
+            lambda: _job_suggestions(last_terms),
+            ttl=SUGGESTION_CACHE_TTL,
+            enabled=not req.no_cache,
+        )
 
         titles = ", ".join(j["title"] for j in suggestions)
         messages.append(
@@ -858,18 +2656,23 @@ async def chat(req: ChatRequest):
             }
         )
 
-    client = AsyncOpenAI(api_key=openai.api_key)
-    resp = await client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=messages,
-        max_tokens=120,
-        temperature=0.7,
+    reply = await llm_cache.get_or_compute(
+        "chat",
+        {
+            "model": CHAT_MODEL,
+            "messages": [[m["role"], _normalize_text(m.get("content") or "")] for m in messages],
+        },
+        lambda: _complete_chat(messages),
+        ttl=LLM_CACHE_TTL,
+        enabled=not req.no_cache,
     )
-    reply = resp.choices[0].message.content.strip()
 
-    
+    if chat_session_id:
+        await run_in_threadpool(_finish_turn, chat_session_id, reply)
+
     return {
         "reply": reply,
+        "session_id": chat_session_id,
         "jobs": [
             {
                 "title": j["title"],
@@ -880,18 +2683,23 @@ async def chat(req: ChatRequest):
         ],
     }
 
-import csv
-from fastapi import UploadFile, File
-
-@api_router.post("/upload_csv")
-async def upload_csv(
-    employer_id: int = Body(...),
-    file: UploadFile = File(...),
+@api_router.post("/chat")
+async def chat(
+    req: ChatRequest,
+    response: Response,
+    background: bool = Query(False),
     session: Session = Depends(get_session)
 ):
-    contents = await file.read()
-    decoded = contents.decode("utf-8").splitlines()
-    reader = csv.DictReader(decoded)
+    if background:
+        return _accepted(response, enqueue_job(session, "chat", {"req": req.model_dump()}, priority=10))
+    return await _chat_reply(req)
+
+from fastapi import UploadFile, File
+
+def _ingest_csv(session: Session, employer_id: int, text: str) -> int:
+    # newline="" keeps line breaks inside quoted fields, e.g. the multi-line
+    # descriptions the listings export writes
+    reader = csv.DictReader(io.StringIO(text, newline=""))
 
     count = 0
     for row in reader:
@@ -911,9 +2719,290 @@ async def upload_csv(
             print("Skipping row due to error:", e)
             continue
 
+    if count:
+        publish_change(session, "listing")
     session.commit()
+    return count
+
+@api_router.post("/upload_csv")
+async def upload_csv(
+    response: Response,
+    employer_id: int = Body(...),
+    file: UploadFile = File(...),
+    background: bool = Query(False),
+    session: Session = Depends(get_session)
+):
+    contents = await file.read()
+    text = contents.decode("utf-8")
+    if background:
+        return _accepted(response, enqueue_job(
+            session, "upload_csv", {"employer_id": employer_id, "text": text}
+        ))
+
+    count = _ingest_csv(session, employer_id, text)
     return {"message": f"{count} job listings uploaded successfully"}
 
 
 
-app.include_router(api_router, prefix="/api")
\ No newline at end of file
+# ----- Background jobs -----
+# Jobs live in the backgroundjob table, so they survive restarts and any
+# worker process sharing jobs.db can pick them up. A claimed job holds a
+# lease (run_after) that its worker renews every third of the lease while
+# the job runs, so only a job whose worker died is handed out again.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_HANDLERS = {}
+
+_job_wakeup = threading.Event()
+_job_stop = threading.Event()
+_job_threads: list[threading.Thread] = []
+
+def job_handler(kind: str):
+    def register(fn):
+        JOB_HANDLERS[kind] = fn
+        return fn
+    return register
+
+def enqueue_job(
+    session: Session, kind: str, payload: dict, priority: int = 0, max_attempts: int = 3
+) -> BackgroundJob:
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = BackgroundJob(
+        kind=kind, payload=json.dumps(payload), priority=priority, max_attempts=max_attempts
+    )
+    session.add(job); session.commit(); session.refresh(job)
+    _job_wakeup.set()
+    return job
+
+def _accepted(response: Response, job: BackgroundJob):
+    response.status_code = status.HTTP_202_ACCEPTED
+    return {"job_id": job.id, "status": job.status}
+
+def _claim_job() -> Optional[int]:
+    with Session(engine) as session:
+        now = _utcnow()
+        candidates = session.exec(
+            select(BackgroundJob.id)
+            .where(
+                BackgroundJob.status.in_(["queued", "running"]),
+                BackgroundJob.run_after <= now,
+            )
+            .order_by(BackgroundJob.priority.desc(), BackgroundJob.id)
+            .limit(5)
+        ).all()
+        for job_id in candidates:
+            # Conditional UPDATE so only one worker (thread or process) wins
+            claimed = session.exec(
+                update(BackgroundJob)
+                .where(
+                    BackgroundJob.id == job_id,
+                    BackgroundJob.status.in_(["queued", "running"]),
+                    BackgroundJob.run_after <= now,
+                )
+                .values(
+                    status="running",
+                    attempts=BackgroundJob.attempts + 1,
+                    run_after=now + timedelta(seconds=JOB_LEASE_SECONDS),
+                    updated_at=now,
+                )
+            )
+            session.commit()
+            if claimed.rowcount:
+                return job_id
+    return None
+
+def _renew_lease(job_id: int, attempt: int, done: threading.Event):
+    while not done.wait(JOB_LEASE_SECONDS / 3):
+        try:
+            with Session(engine) as session:
+                # Only while this attempt still owns the job
+                renewed = session.exec(
+                    update(BackgroundJob)
+                    .where(
+                        BackgroundJob.id == job_id,
+                        BackgroundJob.status == "running",
+                        BackgroundJob.attempts == attempt,
+                    )
+                    .values(run_after=_utcnow() + timedelta(seconds=JOB_LEASE_SECONDS))
+                )
+                session.commit()
+        except Exception as e:
+            print("Job worker could not renew a lease:", e)
+            continue
+        if not renewed.rowcount:
+            return
+
+def _run_job(job_id: int):
+    with Session(engine) as session:
+        job = session.get(BackgroundJob, job_id)
+        done = threading.Event()
+        threading.Thread(
+            target=_renew_lease, args=(job_id, job.attempts, done), name=f"job-lease-{job_id}", daemon=True
+        ).start()
+        try:
+            if job.attempts > job.max_attempts:
+                raise RuntimeError("Lease expired on the final attempt")
+            handler = JOB_HANDLERS.get(job.kind)
+            if handler is None:
+                raise ValueError(f"Unknown job kind: {job.kind}")
+            result = handler(**json.loads(job.payload))
+            if inspect.iscoroutine(result):
+                result = asyncio.run(result)
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            if job.attempts < job.max_attempts:
+                job.status = "queued"
+                job.run_after = _utcnow() + timedelta(seconds=2 ** job.attempts)
+            else:
+                job.status = "failed"
+        else:
+            job.status = "done"
+            job.result = json.dumps(result, default=str)
+            job.error = None
+        finally:
+            done.set()
+        job.updated_at = _utcnow()
+        session.add(job)
+        session.commit()
+
+def _job_worker():
+    while not _job_stop.is_set():
+        try:
+            job_id = _claim_job()
+        except Exception as e:
+            print("Job worker could not claim a job:", e)
+            job_id = None
+        if job_id is None:
+            _job_wakeup.wait(JOB_POLL_INTERVAL)
+            _job_wakeup.clear()
+            continue
+        _run_job(job_id)
+
+def start_job_workers():
+    _job_stop.clear()
+    for i in range(JOB_WORKERS):
+        t = threading.Thread(target=_job_worker, name=f"job-worker-{i}", daemon=True)
+        t.start()
+        _job_threads.append(t)
+
+def stop_job_workers():
+    _job_stop.set()
+    _job_wakeup.set()
+    for t in _job_threads:
+        t.join(timeout=5)
+    _job_threads.clear()
+
+@job_handler("upload_csv")
+def _upload_csv_job(employer_id: int, text: str):
+    with Session(engine) as session:
+        return {"count": _ingest_csv(session, employer_id, text)}
+
+@job_handler("delete_listing")
+def _delete_listing_job(listing_id: int):
+    with Session(engine) as session:
+        return {"ok": _delete_listing(session, listing_id)}
+
+@job_handler("adzuna")
+def _adzuna_job(q: str):
+    return _fetch_adzuna(q)
+
+@job_handler("chat")
+def _chat_job(req: dict):
+    return _chat_reply(ChatRequest(**req))
+
+@job_handler("compact")
+def _compact_job(retention_days: int = TOMBSTONE_RETENTION_DAYS):
+    return compact_database(retention_days)
+
+@job_handler("snapshot")
+def _snapshot_job():
+    return create_snapshot()
+
+@api_router.get("/jobs/{job_id}")
+def get_job(job_id: int, session: Session = Depends(get_session)):
+    job = session.get(BackgroundJob, job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "priority": job.priority,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
+
+
+
+# ----- Admission stats -----
+@api_router.get("/admission/stats")
+def get_admission_stats():
+    return {
+        route: {
+            **admission_stats.get(route, {}),
+            "in_flight": _in_flight.get(route, 0),
+            "limits": limits,
+        }
+        for route, limits in ADMISSION_LIMITS.items()
+    } | {"tracked_clients": len(_buckets)}
+
+
+
+# ----- Maintenance -----
+@api_router.post("/maintenance/compact")
+def compact(
+    response: Response,
+    retention_days: int = Query(TOMBSTONE_RETENTION_DAYS),
+    background: bool = Query(False),
+    session: Session = Depends(get_session)
+):
+    if background:
+        return _accepted(response, enqueue_job(session, "compact", {"retention_days": retention_days}))
+    return compact_database(retention_days)
+
+@api_router.post("/maintenance/snapshot")
+def snapshot(
+    response: Response,
+    background: bool = Query(False),
+    session: Session = Depends(get_session)
+):
+    if background:
+        return _accepted(response, enqueue_job(session, "snapshot", {}))
+    return create_snapshot()
+
+
+
+app.include_router(api_router, prefix="/api")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="jobs.db maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    compact_cmd = commands.add_parser("compact", help="purge old tombstones and vacuum jobs.db")
+    compact_cmd.add_argument("--retention-days", type=int, default=TOMBSTONE_RETENTION_DAYS)
+    commands.add_parser("rebuild-rollups", help="rebuild hiring analytics from the event log")
+    commands.add_parser("geocode-backfill", help="geocode listings that have no coordinates yet")
+    backup_cmd = commands.add_parser("backup", help="online backup of jobs.db while the app keeps writing")
+    backup_cmd.add_argument("output", nargs="?", default=SNAPSHOT_FILE)
+    args = parser.parse_args()
+
+    engine.echo = False
+    _enable_wal()
+    _migrate_schema()
+    migrate_profile_snapshots()
+    if args.command == "compact":
+        print(json.dumps(compact_database(args.retention_days), indent=2))
+    elif args.command == "rebuild-rollups":
+        print(f"{rebuild_hiring_rollups()} rollup rows rebuilt")
+    elif args.command == "geocode-backfill":
+        print(f"{backfill_listing_coordinates()} listings geocoded")
+    elif args.command == "backup":
+        print(json.dumps(create_snapshot(args.output), indent=2))
@@ -7,6 +7,7 @@ export default function Chatbot({ searchHistory = [] }) {
   const [open, setOpen]     = useState(false);
   const [input, setInput]   = useState("");
   const [history, setHist]  = useState([]); 
+  const [sessionId, setSessionId] = useState(null);
   const bottomRef = useRef(null);
 
  
@@ -21,17 +22,22 @@ export default function Chatbot({ searchHistory = [] }) {
   [open, history.length]);
   const send = () => {
     if (!input.trim()) return;
-    const newHist = [...history, { role: "user", content: input }];
-    setHist(newHist);
+    const message = input;
+    setHist(h => [...h, { role: "user", content: message }]);
     setInput("");
 
+    // The conversation lives server-side; only the new message is sent
     fetch(apiBaseUrl + "/chat", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ history: newHist, search_history: searchHistory }),
+      body: JSON.stringify({ message, session_id: sessionId, search_history: searchHistory }),
     })
-      .then(r => r.json())
+      .then(r => {
+        if (!r.ok) throw new Error(r.status);
+        return r.json();
+      })
       .then(d => {
+        if (d.session_id) setSessionId(d.session_id);
         setHist(h => [
           ...h,
           { role: "assistant", content: d.reply },
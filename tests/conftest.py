@@ -0,0 +1,38 @@
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Backend opens jobs.db relative to the working directory, so the tests run
+# against a throwaway copy of the committed database
+WORKDIR = tempfile.mkdtemp(prefix="jobs-tests-")
+shutil.copy(ROOT / "jobs.db", WORKDIR)
+os.chdir(WORKDIR)
+os.environ.setdefault("CHANGE_POLL_INTERVAL", "0.05")
+os.environ.setdefault("SNAPSHOT_INTERVAL", "0")
+
+import Backend  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+Backend.engine.echo = False
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    Backend._enable_wal()
+    Backend._migrate_schema()
+    Backend.migrate_profile_snapshots()
+    yield
+    shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+@pytest.fixture
+def client():
+    with TestClient(Backend.app) as c:
+        yield c
@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import Backend
+
+
+@pytest.fixture(autouse=True)
+def fresh_admission_state():
+    Backend._buckets.clear()
+    Backend._in_flight.clear()
+    yield
+    Backend._buckets.clear()
+
+
+def _login(client, headers=None):
+    return client.post("/api/login", data={"username": "nobody", "password": "x"}, headers=headers)
+
+
+def test_burst_beyond_bucket_is_shed(client):
+    burst = Backend.ADMISSION_LIMITS["/api/login"]["burst"]
+    codes = [_login(client).status_code for _ in range(burst + 10)]
+    assert 429 not in codes[:burst]
+    assert codes[burst:] == [429] * 10
+
+    shed = _login(client)
+    assert shed.status_code == 429
+    assert int(shed.headers["Retry-After"]) >= 1
+
+
+def test_rotating_fake_tokens_share_the_address_bucket(client):
+    burst = Backend.ADMISSION_LIMITS["/api/login"]["burst"]
+    codes = [
+        _login(client, {"Authorization": f"Bearer fake-{i}"}).status_code
+        for i in range(burst + 10)
+    ]
+    assert codes.count(429) == 10
+    assert len(Backend._buckets) == 1
+
+
+def test_valid_tokens_for_one_subject_share_a_bucket(client):
+    burst = Backend.ADMISSION_LIMITS["/api/login"]["burst"]
+    codes = []
+    for i in range(burst + 5):
+        token = Backend.create_token({"sub": "alice", "role": "user"}, minutes=60 + i)
+        codes.append(_login(client, {"Authorization": f"Bearer {token}"}).status_code)
+    assert codes.count(429) == 5
+    assert list(Backend._buckets) == [("/api/login", "user:alice")]
+
+
+def test_concurrency_cap_sheds_excess_in_flight(monkeypatch):
+    limits = {"rate": 1000.0, "burst": 1000, "concurrency": 2}
+    monkeypatch.setitem(Backend.ADMISSION_LIMITS, "/api/search", limits)
+
+    def slow_search(q, origin=None, radius=None):
+        time.sleep(0.3)
+        return []
+    monkeypatch.setattr(Backend, "_search_listings", slow_search)
+
+    async def burst():
+        transport = httpx.ASGITransport(app=Backend.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*[
+                client.get("/api/search", params={"q": f"term-{i}"}) for i in range(6)
+            ])
+
+    codes = sorted(r.status_code for r in asyncio.run(burst()))
+    assert codes == [200, 200, 429, 429, 429, 429]
+    assert Backend._in_flight["/api/search"] == 0
+
+
+def test_bucket_table_is_bounded(client, monkeypatch):
+    monkeypatch.setattr(Backend, "ADMISSION_MAX_CLIENTS", 3)
+    for i in range(10):
+        token = Backend.create_token({"sub": f"user-{i}", "role": "user"})
+        _login(client, {"Authorization": f"Bearer {token}"})
+    assert len(Backend._buckets) == 3
@@ -0,0 +1,79 @@
+import os
+import queue
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+import Backend
+from conftest import ROOT, WORKDIR
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def _notify_from_other_connection(topic, key):
+    # Another connection stands in for another worker process: the listener
+    # only sees these through PRAGMA data_version
+    conn = sqlite3.connect(Backend.sqlite_file_name, timeout=30)
+    with conn:
+        seq = conn.execute(
+            "INSERT INTO changenotice (topic, key, created_at) VALUES (?, ?, ?)",
+            (topic, key, Backend._utcnow().isoformat(" ")),
+        ).lastrowid
+    conn.close()
+    return seq
+
+
+def test_listener_keeps_delivering_after_prune(client):
+    seen = []
+    Backend.on_change("prune-test")(seen.append)
+
+    first = [_notify_from_other_connection("prune-test", k) for k in (1, 2, 3)]
+    assert _wait_for(lambda: seen[-1:] == [3])
+
+    # What the listener's retention prune does after a quiet hour
+    conn = sqlite3.connect(Backend.sqlite_file_name, timeout=30)
+    with conn:
+        conn.execute("DELETE FROM changenotice")
+    conn.close()
+
+    seq = _notify_from_other_connection("prune-test", 4)
+    assert seq > max(first)
+    assert _wait_for(lambda: seen[-1:] == [4])
+
+
+def test_change_reaches_another_process(client):
+    listing = client.get("/api/listings").json()[0]
+    child = subprocess.Popen(
+        [sys.executable, "-c", (
+            "import time, Backend\n"
+            "Backend.engine.echo = False\n"
+            "Backend.on_change('listing')(lambda key: print('changed', key, flush=True))\n"
+            "Backend.start_change_listener()\n"
+            "print('ready', flush=True)\n"
+            "time.sleep(30)\n"
+        )],
+        cwd=WORKDIR,
+        env={**os.environ, "PYTHONPATH": str(ROOT)},
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    lines = queue.Queue()
+    threading.Thread(target=lambda: [lines.put(l.strip()) for l in child.stdout], daemon=True).start()
+    try:
+        assert lines.get(timeout=30) == "ready"
+        time.sleep(0.2)
+        client.put(f"/api/listings/{listing['id']}", json={"salary": "changed"}).raise_for_status()
+        assert lines.get(timeout=5) == f"changed {listing['id']}"
+    finally:
+        child.kill()
+        child.wait()
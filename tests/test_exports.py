@@ -0,0 +1,63 @@
+import csv
+import io
+
+from sqlmodel import Session, select
+
+import Backend
+
+
+def _new_employer(name):
+    with Session(Backend.engine) as session:
+        employer = Backend.Employer(employer_name=name, username=name, hashed_password="x")
+        session.add(employer)
+        session.commit()
+        return employer.id
+
+
+def _listings(employer_id):
+    with Session(Backend.engine) as session:
+        rows = session.exec(
+            select(Backend.JobListing)
+            .where(Backend.JobListing.employer_id == employer_id)
+            .order_by(Backend.JobListing.id)
+        ).all()
+        return [{f: getattr(row, f) for f in Backend.LISTING_FIELDS} for row in rows]
+
+
+def test_listing_export_uploads_back_unchanged(client):
+    source = _new_employer("export-source")
+    target = _new_employer("export-target")
+    listings = [
+        {"title": "Analyst", "location": "Chicago, IL", "type": "Full-time", "experience": "Mid",
+         "salary": "$90,000", "description": "line1\nline2\n\n\"quoted\", with comma"},
+        {"title": "Intern", "location": "Remote", "type": "Internship", "experience": "Entry",
+         "salary": "", "description": "single line"},
+    ]
+    for listing in listings:
+        client.post("/api/listings", json={"employer_id": source, **listing}).raise_for_status()
+
+    exported = client.get(f"/api/employers/{source}/listings/export", params={"format": "csv"})
+    assert exported.status_code == 200
+    assert len(list(csv.DictReader(io.StringIO(exported.text, newline="")))) == 2
+
+    Backend._buckets.clear()
+    uploaded = client.post(
+        "/api/upload_csv",
+        data={"employer_id": str(target)},
+        files={"file": ("listings.csv", exported.content, "text/csv")},
+    )
+    assert uploaded.status_code == 200
+    assert _listings(target) == _listings(source) == listings
+
+
+def test_ndjson_export_has_one_object_per_line(client):
+    employer_id = _new_employer("export-ndjson")
+    client.post("/api/listings", json={
+        "employer_id": employer_id, "title": "A", "location": "Austin, TX", "type": "Contract",
+        "experience": "Senior", "salary": "1", "description": "two\nlines",
+    }).raise_for_status()
+
+    exported = client.get(f"/api/employers/{employer_id}/listings/export", params={"format": "ndjson"})
+    lines = exported.text.splitlines()
+    assert len(lines) == 1
+    assert '"two\\nlines"' in lines[0]
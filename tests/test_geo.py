@@ -0,0 +1,46 @@
+import pytest
+from sqlmodel import Session, select
+
+import Backend
+
+
+def _place_listing(lat, lon):
+    # Coordinates set directly, since the gazetteer only covers US cities
+    with Session(Backend.engine) as session:
+        employer_id = session.exec(select(Backend.Employer.id)).first()
+        listing = Backend.JobListing(
+            employer_id=employer_id, title="Geo test", location="Remote",
+            type="Full-time", experience="Entry", salary="1", description="x",
+        )
+        session.add(listing)
+        session.commit()
+        session.connection().exec_driver_sql(
+            "UPDATE joblisting SET latitude = ?, longitude = ?, geo_cell = ? WHERE id = ?",
+            (lat, lon, Backend._geo_cell(lat, lon), listing.id),
+        )
+        session.commit()
+        return listing.id
+
+
+def test_geocode_formats():
+    chicago = Backend.geocode("Chicago, IL")
+    assert chicago is not None
+    assert Backend.geocode("chicago, illinois") == chicago
+    assert Backend.geocode("Chicago, IL 60601") == chicago
+    assert Backend.geocode("Remote") is None
+
+
+def test_radius_search_is_nearest_first(client):
+    response = client.get("/api/search", params={"near": "Evanston, IL", "radius": 30})
+    distances = [row["distance_miles"] for row in response.json()]
+    assert distances and distances == sorted(distances)
+    assert all(d <= 30 for d in distances)
+
+    assert client.get("/api/search", params={"near": "Nowhere, ZZ"}).status_code == 400
+
+
+@pytest.mark.parametrize("origin_lon, listing_lon", [(179.95, -179.95), (-179.95, 179.95)])
+def test_radius_search_across_the_antimeridian(origin_lon, listing_lon):
+    listing_id = _place_listing(-17.0, listing_lon)
+    results = Backend._search_listings("", (-17.0, origin_lon), 25)
+    assert listing_id in [row["id"] for row in results]
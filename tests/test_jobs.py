@@ -0,0 +1,125 @@
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+from sqlmodel import Session, delete, update
+
+import Backend
+
+runs = []
+
+
+@Backend.job_handler("test-record")
+def _record(name: str, seconds: float = 0.0):
+    runs.append(name)
+    time.sleep(seconds)
+    return {"name": name}
+
+
+@Backend.job_handler("test-fail")
+def _fail():
+    runs.append("fail")
+    raise RuntimeError("upstream down")
+
+
+@pytest.fixture(autouse=True)
+def empty_queue():
+    runs.clear()
+    with Session(Backend.engine) as session:
+        session.exec(delete(Backend.BackgroundJob))
+        session.commit()
+
+
+def _enqueue(kind, payload, **kwargs):
+    with Session(Backend.engine) as session:
+        return Backend.enqueue_job(session, kind, payload, **kwargs).id
+
+
+def _job(job_id):
+    with Session(Backend.engine) as session:
+        return session.get(Backend.BackgroundJob, job_id)
+
+
+def _make_due(job_id):
+    # Stands in for waiting out the backoff
+    with Session(Backend.engine) as session:
+        session.exec(update(Backend.BackgroundJob)
+                     .where(Backend.BackgroundJob.id == job_id)
+                     .values(run_after=Backend._utcnow()))
+        session.commit()
+
+
+def test_higher_priority_jobs_are_claimed_first():
+    low = _enqueue("test-record", {"name": "low"})
+    high = _enqueue("test-record", {"name": "high"}, priority=10)
+    mid = _enqueue("test-record", {"name": "mid"}, priority=5)
+    same_as_low = _enqueue("test-record", {"name": "low-2"})
+
+    assert [Backend._claim_job() for _ in range(5)] == [high, mid, low, same_as_low, None]
+
+
+def test_failures_retry_with_backoff_until_failed():
+    job_id = _enqueue("test-fail", {}, max_attempts=3)
+
+    for attempt in (1, 2):
+        assert Backend._claim_job() == job_id
+        before = Backend._utcnow()
+        Backend._run_job(job_id)
+        job = _job(job_id)
+        assert (job.status, job.attempts) == ("queued", attempt)
+        assert job.error == "RuntimeError: upstream down"
+        backoff = job.run_after.replace(tzinfo=before.tzinfo) - before
+        assert timedelta(seconds=2 ** attempt - 1) < backoff <= timedelta(seconds=2 ** attempt + 1)
+        assert Backend._claim_job() is None
+        _make_due(job_id)
+
+    assert Backend._claim_job() == job_id
+    Backend._run_job(job_id)
+    job = _job(job_id)
+    assert (job.status, job.attempts) == ("failed", 3)
+    assert runs == ["fail"] * 3
+    _make_due(job_id)
+    assert Backend._claim_job() is None
+
+
+def test_job_outliving_its_lease_runs_once(monkeypatch):
+    monkeypatch.setattr(Backend, "JOB_LEASE_SECONDS", 1)
+    job_id = _enqueue("test-record", {"name": "slow", "seconds": 2.5})
+    assert Backend._claim_job() == job_id
+
+    worker = threading.Thread(target=Backend._run_job, args=(job_id,))
+    worker.start()
+    while worker.is_alive():
+        assert Backend._claim_job() is None
+        time.sleep(0.1)
+
+    job = _job(job_id)
+    assert (job.status, job.attempts) == ("done", 1)
+    assert runs == ["slow"]
+
+
+def test_job_of_a_dead_worker_is_handed_out_again(monkeypatch):
+    monkeypatch.setattr(Backend, "JOB_LEASE_SECONDS", 1)
+    job_id = _enqueue("test-record", {"name": "orphan"})
+    assert Backend._claim_job() == job_id
+    # The claiming worker never runs it and never renews the lease
+    assert Backend._claim_job() is None
+    time.sleep(1.1)
+    assert Backend._claim_job() == job_id
+    assert _job(job_id).attempts == 2
+
+
+def test_job_status_endpoint(client):
+    job_id = _enqueue("test-record", {"name": "via-api"})
+    deadline = time.monotonic() + 10
+    while client.get(f"/api/jobs/{job_id}").json()["status"] != "done":
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+    body = client.get(f"/api/jobs/{job_id}").json()
+    assert body["kind"] == "test-record"
+    assert body["attempts"] == 1
+    assert body["result"] == {"name": "via-api"}
+    assert body["error"] is None
+    assert client.get("/api/jobs/999999").status_code == 404
@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta, timezone
+
+import Backend
+
+
+def _recent(value):
+    created = datetime.fromisoformat(value)
+    if created.tzinfo is None:
+        created = created.replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc) - created < timedelta(minutes=5)
+
+
+def test_create_ignores_server_owned_fields(client):
+    Backend._buckets.clear()
+    server_owned = {"id": 999999, "created_at": "2001-01-01T00:00:00", "deleted_at": "2001-01-01T00:00:00"}
+
+    employer = client.post("/api/employers", json={
+        "employer_name": "server-fields", "username": "server-fields", "hashed_password": "x", **server_owned,
+    })
+    assert employer.status_code == 200
+    employer = employer.json()
+    assert employer["id"] != 999999
+    assert employer["deleted_at"] is None
+
+    listing = client.post("/api/listings", json={
+        "employer_id": employer["id"], "title": "Welder", "location": "Tulsa, OK", "type": "Full-time",
+        "experience": "Mid", "salary": "", "description": "", **server_owned,
+    })
+    assert listing.status_code == 200
+    listing = listing.json()
+    assert listing["id"] != 999999
+    assert listing["deleted_at"] is None
+    assert _recent(listing["created_at"])
+    assert listing["id"] in [l["id"] for l in client.get(f"/api/employers/{employer['id']}/listings").json()]
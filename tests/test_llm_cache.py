@@ -0,0 +1,153 @@
+import asyncio
+import socket
+import threading
+import time
+
+import openai
+import pytest
+import uvicorn
+from fastapi import FastAPI
+from sqlmodel import Session, func, select
+
+import Backend
+
+
+def _fake_llm_app(calls):
+    fake = FastAPI()
+
+    @fake.post("/v1/chat/completions")
+    async def complete(body: dict):
+        calls.append(body["messages"][-1]["content"])
+        await asyncio.sleep(0.1)
+        return {
+            "id": "fake", "object": "chat.completion", "created": int(time.time()), "model": body["model"],
+            "choices": [{
+                "index": 0, "finish_reason": "stop",
+                "message": {"role": "assistant", "content": f"answer #{len(calls)}"},
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }
+
+    return fake
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    calls = []
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(_fake_llm_app(calls), port=port, log_level="error"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+
+    monkeypatch.setattr(Backend, "OPENAI_BASE_URL", f"http://127.0.0.1:{port}/v1")
+    monkeypatch.setattr(openai, "api_key", "test-key")
+    monkeypatch.delitem(Backend.ADMISSION_LIMITS, "/api/chat")
+    Backend.llm_cache._memory.clear()
+    yield calls
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+def _ask(client, message, **extra):
+    response = client.post("/api/chat", json={"message": message, **extra})
+    response.raise_for_status()
+    return response.json()["reply"]
+
+
+def test_repeated_questions_are_answered_from_cache(client, fake_llm):
+    first = _ask(client, "Which jobs suit a data analyst?")
+    assert _ask(client, "which   jobs suit a DATA analyst?") == first
+    assert len(fake_llm) == 1
+
+    _ask(client, "Something different entirely")
+    assert len(fake_llm) == 2
+
+    _ask(client, "Which jobs suit a data analyst?", no_cache=True)
+    assert len(fake_llm) == 3
+
+
+def test_entries_survive_losing_the_memory_tier(client, fake_llm):
+    first = _ask(client, "Remote roles for designers?")
+    Backend.llm_cache._memory.clear()
+    assert _ask(client, "Remote roles for designers?") == first
+    assert len(fake_llm) == 1
+
+
+def test_table_access_stays_off_the_event_loop(client, fake_llm, monkeypatch):
+    on_loop = []
+    for name in ("_load", "put"):
+        original = getattr(Backend.llm_cache, name)
+
+        def record(*args, _original=original, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return _original(*args, **kwargs)
+        monkeypatch.setattr(Backend.llm_cache, name, record)
+
+    _ask(client, "Off-loop question")
+    Backend.llm_cache._memory.clear()
+    _ask(client, "Off-loop question")
+    assert on_loop == [False, False, False]
+    assert len(fake_llm) == 1
+
+
+def test_table_is_trimmed_every_n_inserts(monkeypatch):
+    cache = Backend.ResponseCache(size=3, memory_size=8)
+    monkeypatch.setattr(Backend, "LLM_CACHE_TRIM_EVERY", 5)
+    with Session(Backend.engine) as session:
+        session.exec(Backend.delete(Backend.LLMCacheEntry))
+        session.commit()
+
+    def count():
+        with Session(Backend.engine) as session:
+            return session.exec(select(func.count()).select_from(Backend.LLMCacheEntry)).one()
+
+    for i in range(4):
+        cache.put(cache.make_key("trim", i), i, ttl=60)
+    assert count() == 4
+    cache.put(cache.make_key("trim", 4), 4, ttl=60)
+    assert count() == 3
+    assert cache.get(cache.make_key("trim", 4)) == 4
+
+
+def test_chat_needs_a_message_or_history(client, fake_llm):
+    assert client.post("/api/chat", json={}).status_code == 422
+    assert client.post("/api/chat", json={"search_history": ["nurse"]}).status_code == 422
+    assert fake_llm == []
+
+
+def test_session_storage_stays_off_the_event_loop(client, fake_llm, monkeypatch):
+    monkeypatch.setattr(Backend, "CHAT_CONTEXT_TOKENS", 60)
+    on_loop = []
+    for name in ("_start_turn", "_load_turns", "_save_summary", "_finish_turn"):
+        original = getattr(Backend, name)
+
+        def record(*args, _name=name, _original=original, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(_name)
+            except RuntimeError:
+                pass
+            return _original(*args, **kwargs)
+        monkeypatch.setattr(Backend, name, record)
+
+    session_id = None
+    for i in range(4):
+        response = client.post("/api/chat", json={
+            "message": f"Question {i} about warehouse jobs near Denver, with a few more words",
+            "session_id": session_id, "no_cache": True,
+        })
+        response.raise_for_status()
+        session_id = response.json()["session_id"]
+    assert on_loop == []
+
+    stored = client.get(f"/api/chat/sessions/{session_id}").json()
+    assert len(stored["turns"]) == 8
+    assert stored["summary"]
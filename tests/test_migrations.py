@@ -0,0 +1,60 @@
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import time
+
+from conftest import ROOT
+
+BOOT = (
+    "import sys, time\n"
+    "start = float(sys.argv[1])\n"
+    "import Backend\n"
+    "Backend.engine.echo = False\n"
+    "time.sleep(max(0.0, start - time.time()))\n"
+    "Backend._enable_wal()\n"
+    "Backend._migrate_schema()\n"
+    "Backend.migrate_profile_snapshots()\n"
+)
+
+
+def test_workers_booting_together_migrate_once(tmp_path):
+    # The committed jobs.db predates every migration; add a changenotice
+    # table from before it used AUTOINCREMENT so the rebuild runs too
+    shutil.copy(ROOT / "jobs.db", tmp_path)
+    conn = sqlite3.connect(tmp_path / "jobs.db")
+    with conn:
+        conn.execute(
+            "CREATE TABLE changenotice (seq INTEGER NOT NULL PRIMARY KEY, topic VARCHAR NOT NULL, "
+            "key INTEGER, created_at DATETIME NOT NULL)"
+        )
+        conn.execute("INSERT INTO changenotice VALUES (41, 'listing', NULL, '2026-01-01 00:00:00')")
+    conn.close()
+
+    start = time.time() + 3
+    workers = [
+        subprocess.Popen(
+            [sys.executable, "-c", BOOT, str(start)],
+            cwd=tmp_path,
+            env={**os.environ, "PYTHONPATH": str(ROOT)},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        for _ in range(4)
+    ]
+    errors = [w.communicate(timeout=120)[1] for w in workers]
+    assert [w.returncode for w in workers] == [0] * 4, errors
+
+    conn = sqlite3.connect(tmp_path / "jobs.db")
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    columns = {row[1] for row in conn.execute('PRAGMA table_info("joblisting")')}
+    notice_sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'changenotice'").fetchone()[0]
+    sequence = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changenotice'").fetchone()
+    conn.close()
+
+    assert not [t for t in tables if t.endswith("_old")]
+    assert {"created_at", "updated_at", "deleted_at", "geo_cell"} <= columns
+    assert "AUTOINCREMENT" in notice_sql
+    assert sequence == (41,)
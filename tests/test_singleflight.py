@@ -0,0 +1,120 @@
+import asyncio
+
+import httpx
+import pytest
+
+import Backend
+
+
+async def _gather_requests(path, params, n):
+    transport = httpx.ASGITransport(app=Backend.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(*[client.get(path, params=params) for _ in range(n)])
+
+
+def test_concurrent_adzuna_calls_share_one_upstream_call(monkeypatch):
+    calls = []
+
+    async def fake_fetch(q):
+        calls.append(q)
+        await asyncio.sleep(0.2)
+        return [{"id": "adzuna_1", "title": q}]
+    monkeypatch.setattr(Backend, "_fetch_adzuna", fake_fetch)
+
+    responses = asyncio.run(_gather_requests("/api/adzuna", {"q": "coalesce-adzuna"}, 25))
+    assert [r.status_code for r in responses] == [200] * 25
+    assert all(r.json() == [{"id": "adzuna_1", "title": "coalesce-adzuna"}] for r in responses)
+    assert calls == ["coalesce-adzuna"]
+
+
+def test_concurrent_remote_searches_share_one_remotive_call(monkeypatch):
+    calls = []
+
+    async def fake_remotive(params):
+        calls.append(params)
+        await asyncio.sleep(0.2)
+        return [{
+            "title": "Remote dev", "company_name": "Acme", "url": "https://example.com/1",
+            "publication_date": "2026-01-01", "candidate_required_location": "USA",
+        }]
+    monkeypatch.setattr(Backend, "_query_remotive", fake_remotive)
+
+    responses = asyncio.run(_gather_requests("/api/remote", {"q": "coalesce-remote", "limit": 3}, 20))
+    assert [r.status_code for r in responses] == [200] * 20
+    assert responses[0].json()[0]["company"] == "Acme"
+    assert calls == [{"search": "coalesce-remote", "limit": 3}]
+
+
+def test_follower_takes_over_when_leader_is_cancelled():
+    flight = Backend.SingleFlight()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.2)
+        return "result"
+
+    async def scenario():
+        leader = asyncio.create_task(flight.do(("k",), compute))
+        await asyncio.sleep(0.05)
+        followers = [asyncio.create_task(flight.do(("k",), compute)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*followers)
+
+    assert asyncio.run(scenario()) == ["result"] * 3
+    assert calls == 2
+    assert flight.stats["handoffs"] == 1
+
+
+def test_errors_reach_every_waiter():
+    flight = Backend.SingleFlight()
+    calls = 0
+
+    async def fail():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        raise RuntimeError("upstream down")
+
+    async def scenario():
+        return await asyncio.gather(*[flight.do(("k",), fail) for _ in range(5)], return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert calls == 1
+
+
+def test_forget_drops_results_and_in_flight_stores():
+    flight = Backend.SingleFlight(grace=60)
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.1)
+        return calls
+
+    async def scenario():
+        assert await flight.do(("search", "q"), compute) == 1
+        assert await flight.do(("search", "q"), compute) == 1  # grace hit
+
+        flight.forget("search")
+        assert await flight.do(("search", "q"), compute) == 2
+
+        # A change committed while a computation is running: its (possibly
+        # stale) result answers the callers already waiting, but isn't kept
+        running = asyncio.create_task(flight.do(("search", "q2"), compute))
+        await asyncio.sleep(0.05)
+        flight.forget("search")
+        assert await running == 3
+        assert await flight.do(("search", "q2"), compute) == 4
+
+        flight.forget("other")
+        assert await flight.do(("search", "q2"), compute) == 4
+
+    asyncio.run(scenario())
+    assert calls == 4